@@ -41,8 +41,9 @@ class FastApiBuilder:
             await self._startup_managers()
             await self._startup_tasks()
             yield
-            await self._shutdown_managers()
+            # Reverse order of the startup, tasks flush their last state through the managers
             await self._shutdown_tasks()
+            await self._shutdown_managers()
         
         self.app: Final[FastAPI] = FastAPI(
             debug= not_prod,
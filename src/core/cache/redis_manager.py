@@ -3,6 +3,7 @@ from collections.abc import AsyncGenerator
 
 from pydantic import RedisDsn
 import redis.asyncio as redis
+from redis.commands.core import AsyncScript
 
 from shared.interfaces import BaseManager
 
@@ -39,6 +40,11 @@ class RedisManager(BaseManager):
                 raise
             return False
 
+    def register_script(self, script: str) -> AsyncScript:
+        # Created once by the caller and run with client= from get_client_context, the client here
+        # only provides the encoding for the sha
+        return redis.Redis(connection_pool=self._cache_pool).register_script(script)
+
     @asynccontextmanager
     async def get_client_context(self):
         client = redis.Redis(connection_pool=self._cache_pool)
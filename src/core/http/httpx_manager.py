@@ -0,0 +1,86 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+
+from shared.interfaces import BaseManager
+
+class HttpxManager(BaseManager):
+    def __init__(
+            self,
+            connect_timeout: float = 2.0,
+            read_timeout: float = 5.0,
+            pool_timeout: float = 5.0,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry: Optional[float] = 30.0,
+            max_concurrency: int = 50,
+            max_per_host: int = 2,
+            ) -> None:
+
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=connect_timeout,
+                read=read_timeout,
+                write=read_timeout,
+                pool=pool_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            follow_redirects=False,
+        )
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._max_per_host = max_per_host
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._host_waiters: dict[str, int] = {}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def dispose(self) -> None:
+        await self._client.aclose()
+
+    async def health_check(self, auto_error: bool = False) -> bool:
+        if self._client.is_closed:
+            if auto_error:
+                raise RuntimeError("HTTP client is closed")
+            return False
+        return True
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        async with self._limits(url):
+            return await self._client.get(url, **kwargs)
+
+    async def get_timed(self, url: str, **kwargs) -> tuple[httpx.Response, float]:
+        # Seconds spent on the request itself, the wait for the limits is left out
+        async with self._limits(url):
+            started = time.perf_counter()
+            response = await self._client.get(url, **kwargs)
+            return response, time.perf_counter() - started
+
+    @asynccontextmanager
+    async def _limits(self, url: str):
+        # Per host first, a request queued behind a busy host must not hold a global slot meanwhile
+        async with self._host_limit(httpx.URL(url).host), self._global_limit:
+            yield
+
+    @asynccontextmanager
+    async def _host_limit(self, host: str):
+        semaphore = self._host_limits.get(host, None)
+        if semaphore is None:
+            semaphore = self._host_limits[host] = asyncio.Semaphore(self._max_per_host)
+        self._host_waiters[host] = self._host_waiters.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            # Drop the per-host semaphore once nobody uses it, so the dict does not grow forever
+            self._host_waiters[host] -= 1
+            if not self._host_waiters[host]:
+                del self._host_waiters[host]
+                del self._host_limits[host]
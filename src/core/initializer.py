@@ -6,6 +6,7 @@ from shared.logs import console_handler, file_handler
 from .settings.settings_provider import ProjectSchema, ApiSettings, SecretSettings
 from .database.alchemy_manager import SqlAlchemyManager
 from .cache.redis_manager import RedisManager
+from .http.httpx_manager import HttpxManager
 
 __all__ = (    
     "project",
@@ -13,6 +14,7 @@ __all__ = (
     "secret",
     "database_manager",
     "redis_manager",
+    "http_manager",
     "SecretSettings",
 )
 
@@ -48,4 +50,5 @@ match settings.environment:
 if not settings.database.db_url or not settings.redis.cache_url:
     raise ValueError("PostgresDsn or RedisDsn not found")
 database_manager = SqlAlchemyManager(settings.database.db_url)
-redis_manager = RedisManager(settings.redis.cache_url)
\ No newline at end of file
+redis_manager = RedisManager(settings.redis.cache_url)
+http_manager = HttpxManager(**settings.http.model_dump())
\ No newline at end of file
@@ -2,4 +2,7 @@ from .uvicorn import UvicornSettings
 from .database import DatabaseSettings
 from .redis import RedisSettings
 from .pyproject import ProjectSchema
-from .secret import SecretSettings
\ No newline at end of file
+from .secret import SecretSettings
+from .servers import ServersSettings
+from .http import HttpClientSettings
+from .jwt import JwtSettings
\ No newline at end of file
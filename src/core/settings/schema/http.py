@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+
+class HttpClientSettings(BaseModel):
+    connect_timeout: float = Field(default=2.0, gt=0, description="Seconds to establish a connection")
+    read_timeout: float = Field(default=5.0, gt=0, description="Seconds to wait for a chunk of the response")
+    pool_timeout: float = Field(default=5.0, gt=0, description="Seconds to wait for a free connection in the pool")
+    max_connections: int = Field(default=100, ge=1, description="Maximum number of open connections")
+    max_keepalive_connections: int = Field(default=20, ge=0, description="Maximum number of idle keep-alive connections")
+    keepalive_expiry: float = Field(default=30.0, ge=0, description="Seconds an idle keep-alive connection is kept")
+    max_concurrency: int = Field(default=50, ge=1, description="Maximum number of requests in flight")
+    max_per_host: int = Field(default=2, ge=1, description="Maximum number of requests in flight to one host")
@@ -0,0 +1,7 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class JwtSettings(BaseModel):
+    algorithm: Literal["RS256", "ES256", "EdDSA"] = Field(default="RS256", description="Signing algorithm, the signing key pair has to be of the matching type (RSA, P-256 or Ed25519)")
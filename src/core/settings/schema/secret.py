@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from shared.project_path import secret_path
@@ -5,5 +7,12 @@ from shared.project_path import secret_path
 class SecretSettings(BaseSettings):
     model_config = SettingsConfigDict(secrets_dir=str(secret_path))
 
-    rsa_private: SecretStr
-    rsa_public: SecretStr
+    rsa_private: Optional[SecretStr] = None
+    rsa_public: Optional[SecretStr] = None
+    # Signing key pair of any supported type, takes precedence over the RSA pair
+    jwt_private: Optional[SecretStr] = None
+    jwt_public: Optional[SecretStr] = None
+    # Public keys that were rotated out, still accepted for tokens they signed
+    jwt_public_previous: Optional[SecretStr] = None
+    # Earlier name of jwt_public_previous, still read when that one is not set
+    rsa_public_previous: Optional[SecretStr] = None
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+
+
+class ServersSettings(BaseModel):
+    heartbeat_expire: float = Field(default=7.5, gt=0, description="Seconds after the last heartbeat before a server is considered offline")
+    shared_registry: bool = Field(default=True, description="Keep the live server registry in Redis so that all workers see the same servers")
+    local_cache: bool = Field(default=True, description="Serve registry reads from the in-process L1 copy instead of reading through to Redis")
+    sync_interval: float = Field(default=2.0, gt=0, description="Seconds between expiry sweeps and L1 synchronization with Redis")
+    server_cache_size: int = Field(default=10000, gt=0, description="Maximum number of server settings kept in the in-process cache")
+    server_cache_ttl: float = Field(default=60.0, gt=0, description="Seconds a cached server settings entry is trusted without an invalidation")
+    history_sample_interval: float = Field(default=15.0, gt=0, description="Seconds between online samples taken for the per-server history")
+    history_idle_ttl: float = Field(default=86400.0, gt=0, description="Seconds after the last sample before a server history is dropped from memory")
+    history_persist: bool = Field(default=False, description="Periodically flush hourly and daily history to Postgres so it survives restarts")
+    history_flush_interval: float = Field(default=300.0, gt=0, description="Seconds between history flushes to Postgres")
+    session_token_signed: bool = Field(default=False, description="Issue signed game session tokens that game servers can verify with the public key instead of asking the API")
+    session_token_ttl: float = Field(default=300.0, gt=0, description="Seconds a signed game session token stays valid")
+    game_session_ttl: float = Field(default=86400.0, gt=0, description="Seconds a game session is served from Redis before lookups fall back to Postgres")
+    game_session_flush_interval: float = Field(default=1.0, gt=0, description="Seconds between batched game session writes to Postgres")
+    probe_enabled: bool = Field(default=False, description="Probe the manifest port of every registered server to detect servers players cannot reach")
+    probe_interval: float = Field(default=60.0, gt=0, description="Seconds between two probes of the same server")
+    probe_concurrency: int = Field(default=16, gt=0, description="Maximum number of probes in flight")
+    probe_timeout: float = Field(default=3.0, gt=0, description="Seconds before a probe counts as failed")
+    probe_failures: int = Field(default=2, gt=0, description="Consecutive failed probes before a server is considered unreachable")
+    probe_hide_unreachable: bool = Field(default=False, description="Leave unreachable servers out of the list instead of flagging them")
@@ -5,7 +5,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from shared.project_path import root_path
 from shared.enum import Environment
 
-from .schema import UvicornSettings, DatabaseSettings, RedisSettings, ProjectSchema, SecretSettings
+from .schema import UvicornSettings, DatabaseSettings, RedisSettings, ProjectSchema, SecretSettings, ServersSettings, HttpClientSettings, JwtSettings
 
 class ApiSettings(BaseSettings, UvicornSettings):
     model_config = SettingsConfigDict(
@@ -20,3 +20,6 @@ class ApiSettings(BaseSettings, UvicornSettings):
     environment: Environment = Environment.dev
     database: DatabaseSettings = Field(default_factory=DatabaseSettings)
     redis: RedisSettings = Field(default_factory=RedisSettings)
+    http: HttpClientSettings = Field(default_factory=HttpClientSettings)
+    servers: ServersSettings = Field(default_factory=ServersSettings)
+    jwt: JwtSettings = Field(default_factory=JwtSettings)
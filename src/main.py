@@ -1,9 +1,9 @@
 import uvicorn
-from core import settings, database_manager, redis_manager, FastApiBuilder, ModuleLoader
+from core import settings, database_manager, redis_manager, http_manager, FastApiBuilder, ModuleLoader
 
 from shared.depends import jwt_validator_depends
 
-managers = [database_manager, redis_manager]
+managers = [database_manager, redis_manager, http_manager]
 loader = ModuleLoader(modules_package_name="modules")
 
 app = FastApiBuilder(
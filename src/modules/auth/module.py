@@ -9,6 +9,7 @@ from .routing import (
     logout,
     reset_password_request,
     reset_password,
+    get_jwks,
 )
 
 class AuthModule(BaseModule):
@@ -28,6 +29,7 @@ class AuthModule(BaseModule):
             auth_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)(logout)
             auth_router.post("/reset_password", status_code=status.HTTP_202_ACCEPTED)(reset_password_request)
             auth_router.get("/reset_password/{reset_token}", status_code=status.HTTP_200_OK)(reset_password)
+            auth_router.get("/jwks.json", status_code=status.HTTP_200_OK)(get_jwks)
             # Добавить возможность смены пароля
             
             # Include
@@ -5,13 +5,14 @@ from ipaddress import IPv4Address
 from pydantic import Base64Str
 from user_agents.parsers import UserAgent
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import Request, Response, status, HTTPException, Depends, Form
+from fastapi import Request, Response, status, HTTPException, Depends, Form, Header
 
 from shared.schemas import JwtAccessPayload
 from shared.models import UserAccount
 from shared.enum import UserProvider
 from shared.depends import get_client_ip_depends, parse_useragent_depends, jwt_validator_depends, database_session_depends
-from shared.utils.jwt import issue_refresh, review_tokens_by_jti
+from shared.utils import etag_matches
+from shared.utils.jwt import issue_refresh, review_tokens_by_jti, key_ring
 
 from .schemas import FormAuthLogin, FormAuthSignup, FormResetPasswordRequest, FormResetPassword
 from .utils import password_hashed, create_user
@@ -83,7 +84,12 @@ async def logout(
     access_payload: Optional[JwtAccessPayload] = Depends(jwt_validator_depends),
     ) -> None:
     if access_payload:
-        await review_tokens_by_jti(db_session=db_session, response=response, jti=access_payload.jti)
+        await review_tokens_by_jti(
+            db_session=db_session,
+            response=response,
+            jti=access_payload.jti,
+            expire_at=access_payload.exp,
+        )
         logger.debug("User %s logout", access_payload.sub)
     else:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
@@ -101,4 +107,12 @@ async def reset_password(
     real_ip: IPv4Address = Depends(get_client_ip_depends),
     form_data: FormResetPassword = Form(),
 ):
-    raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED)
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED)
+
+
+async def get_jwks(if_none_match: Optional[str] = Header(default=None)) -> Response:
+    # Built once with the key ring, keys only change with a restart
+    headers = {"ETag": key_ring.jwks_etag, "Cache-Control": "public, max-age=3600"}
+    if etag_matches(if_none_match, key_ring.jwks_etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=key_ring.jwks, media_type="application/jwk-set+json", headers=headers)
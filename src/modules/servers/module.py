@@ -1,21 +1,37 @@
 from fastapi import APIRouter, FastAPI, status, Depends
 
+from core import settings
 from shared.interfaces import BaseModule
 from shared.enum import Environment
-from .utils import GetServerDepends
+from .schema import ServersListResponse, ServersRankingResponse
 from .routing import (
     get_servers_list,
+    get_servers_events,
+    get_servers_stats,
+    get_servers_ranking,
     create_new_server,
     get_server_info,
     server_hearbeat,
+    servers_heartbeat,
+    server_heartbeat_channel,
     update_server_settings,
     delete_server,
     get_server_online,
     get_connect_info,
     get_manifest,
+    get_server_history,
+    get_server_reachability,
     get_user_sessions,
+    resolve_user_sessions,
     сreating_server_session,
-    server_manager_task
+    server_manager_task,
+    manifest_fetch_task,
+    server_probe_task,
+    servers_feed_task,
+    online_history_task,
+    server_cache_task,
+    game_session_write_task,
+    get_server_depends,
 )
 
 
@@ -31,10 +47,15 @@ class ServerModule(BaseModule):
         if self.router:
             # /api/servers
             self.router.post("", status_code=status.HTTP_201_CREATED)(create_new_server)
-            self.router.get("", status_code=status.HTTP_200_OK)(get_servers_list)
+            self.router.get("", status_code=status.HTTP_200_OK, response_model=ServersListResponse)(get_servers_list)
+            self.router.get("/stats", status_code=status.HTTP_200_OK)(get_servers_stats)
+            self.router.get("/ranking", status_code=status.HTTP_200_OK, response_model=ServersRankingResponse)(get_servers_ranking)
+            self.router.get("/events", status_code=status.HTTP_200_OK)(get_servers_events)
+            self.router.post("/heartbeat", status_code=status.HTTP_200_OK)(servers_heartbeat)
+            self.router.websocket("/{server_uuid}/heartbeat")(server_heartbeat_channel)
 
             # /api/servers/{server_uuid}
-            servers_router = APIRouter(prefix="/{server_uuid}", dependencies=[Depends(GetServerDepends(cache_ttl=1800))])
+            servers_router = APIRouter(prefix="/{server_uuid}", dependencies=[Depends(get_server_depends)])
             servers_router.get("", status_code=status.HTTP_200_OK)(get_server_info)
             servers_router.post("", status_code=status.HTTP_204_NO_CONTENT)(server_hearbeat)
             servers_router.patch("", status_code=status.HTTP_200_OK)(update_server_settings)
@@ -42,7 +63,10 @@ class ServerModule(BaseModule):
             servers_router.get("/online", status_code=status.HTTP_200_OK)(get_server_online)
             servers_router.get("/serverinfo", status_code=status.HTTP_200_OK)(get_connect_info)
             servers_router.get("/manifest.json", status_code=status.HTTP_200_OK)(get_manifest)
+            servers_router.get("/reachability", status_code=status.HTTP_200_OK)(get_server_reachability)
+            servers_router.get("/history", status_code=status.HTTP_200_OK)(get_server_history)
             servers_router.post("/sessions", status_code=status.HTTP_200_OK)(сreating_server_session)
+            servers_router.post("/sessions/resolve", status_code=status.HTTP_200_OK)(resolve_user_sessions)
             servers_router.get("/sessions/{sessions}", status_code=status.HTTP_200_OK)(get_user_sessions)
 
             # Include router
@@ -50,5 +74,12 @@ class ServerModule(BaseModule):
 
             # Include tasks
             self.tasks.append(server_manager_task)
+            self.tasks.append(manifest_fetch_task)
+            if settings.servers.probe_enabled:
+                self.tasks.append(server_probe_task)
+            self.tasks.append(servers_feed_task)
+            self.tasks.append(online_history_task)
+            self.tasks.append(server_cache_task)
+            self.tasks.append(game_session_write_task)
 
 
@@ -1,55 +1,222 @@
+import asyncio
 import secrets
+import time
+from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
 from ipaddress import IPv4Address
 
-import httpx
-from fastapi import HTTPException, status, Form, Header, Depends
+from fastapi import HTTPException, Response, status, Form, Header, Query, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from jwt.exceptions import PyJWTError
+from pydantic import ValidationError
 import redis
 from sqlalchemy.ext.asyncio import AsyncSession
+from ulid import ULID
 
+from core import settings, project, database_manager, redis_manager, http_manager
 from shared.depends import get_client_ip_depends, database_session_depends, redis_client_depends
-from shared.schemas import JwtAccessPayload
+from shared.schemas import JwtAccessPayload, JwtGameSessionPayload
 from shared.depends import jwt_validator_depends
+from shared.utils import etag_matches
+from shared.utils.jwt import create_game_session_token, jwt_decode
+from shared.enum import ServerHeartbeatStatus, ServerGamemode, ServersSort, HistoryResolution
 from .schema import (
-    ServersListResponse,
     ServerInfo,
     ServerConnectResponse,
     ServerCreateFormRequest,
-    ServerStorage,
-    ServerModsManifest,
+    ServerRecord,
     ServerModel,
+    GameSessionRecord,
+    ServersHeartbeatRequest,
+    ServersHeartbeatResponse,
+    ServersListResponse,
+    ServerHistoryResponse,
+    ServersStats,
+    ServerRankEntry,
+    ServersRankingResponse,
+    GameSessionsResolveRequest,
+    GameSessionsResolveResponse,
 )
 from .utils import (
     ServerManagementTask,
+    ServerProbeTask,
+    ServerIndex,
+    RedisServerRegistry,
+    ManifestFetcher,
+    ManifestFetchTask,
+    ServersFeedTask,
+    OnlineHistory,
+    OnlineHistoryTask,
+    HISTORY_TIERS,
     GetServerDepends,
-    create_game_session,
+    authenticate_server,
+    ServerCache,
+    ServerCacheInvalidationTask,
+    GameSessionStore,
+    GameSessionWriteTask,
     create_server_by_form,
-    read_game_session_by_token
+    read_game_session_by_token,
+    read_game_session_users_by_tokens,
+    read_server_history,
 )
 
-server_manager_task = ServerManagementTask()
+server_registry = RedisServerRegistry(redis_manager) if settings.servers.shared_registry else None
+server_manager_task = ServerManagementTask(
+    expires=settings.servers.heartbeat_expire,
+    registry=server_registry,
+    local_cache=settings.servers.local_cache,
+    interval=settings.servers.sync_interval,
+    hide_unreachable=settings.servers.probe_hide_unreachable,
+)
+manifest_fetch_task = ManifestFetchTask(
+    fetcher=ManifestFetcher(http_manager),
+    server_manager=server_manager_task,
+)
+server_probe_task = ServerProbeTask(
+    server_manager=server_manager_task,
+    http_manager=http_manager,
+    registry=server_registry,
+    interval=settings.servers.probe_interval,
+    concurrency=settings.servers.probe_concurrency,
+    timeout=settings.servers.probe_timeout,
+    failures=settings.servers.probe_failures,
+)
+servers_feed_task = ServersFeedTask(server_manager=server_manager_task)
+online_history = OnlineHistory()
+online_history_task = OnlineHistoryTask(
+    server_manager=server_manager_task,
+    history=online_history,
+    database_manager=database_manager if settings.servers.history_persist else None,
+    registry=server_registry,
+    sample_interval=settings.servers.history_sample_interval,
+    idle_ttl=settings.servers.history_idle_ttl,
+    flush_interval=settings.servers.history_flush_interval,
+)
+server_cache = ServerCache(maxsize=settings.servers.server_cache_size, ttl=settings.servers.server_cache_ttl)
+server_cache_task = ServerCacheInvalidationTask(cache=server_cache, redis_manager=redis_manager)
+game_session_store = GameSessionStore(redis_manager=redis_manager, ttl=settings.servers.game_session_ttl)
+game_session_write_task = GameSessionWriteTask(
+    store=game_session_store,
+    database_manager=database_manager,
+    interval=settings.servers.game_session_flush_interval,
+)
+# One instance for the router and the handlers, so FastAPI resolves it once per request
+get_server_depends = GetServerDepends(cache_ttl=1800, local_cache=server_cache)
 
 # /api/servers
-async def get_servers_list() -> ServersListResponse:
-    active_servers = await server_manager_task.get_online_servers()
-    servers = {}
-    player = 0
-
-    for server in active_servers:
-        player += active_servers[server].online
-        servers[server] = ServerInfo(
-            name=active_servers[server].display_name,
-            online=active_servers[server].online,
-            maxPlayers=active_servers[server].max_players,
+async def get_servers_list(
+    if_none_match: Optional[str] = Header(default=None),
+    gamemode: Optional[ServerGamemode] = Query(default=None),
+    locale: Optional[str] = Query(default=None, max_length=5),
+    game_version: Optional[str] = Query(default=None, max_length=32),
+    min_online: Optional[int] = Query(default=None, ge=0),
+    max_online: Optional[int] = Query(default=None, ge=0),
+    not_full: bool = Query(default=False),
+    sort: Optional[ServersSort] = Query(default=None),
+    cursor: Optional[str] = Query(default=None, max_length=256),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+) -> Response:
+    filtered = (
+        gamemode, locale, game_version, min_online, max_online, sort, cursor, limit
+    ) != (None,) * 8 or not_full
+    if not filtered:
+        snapshot = await server_manager_task.get_servers_snapshot()
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, snapshot.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=snapshot.content, media_type="application/json", headers=headers)
+
+    sort = sort or ServersSort.online
+    limit = limit or 100
+    try:
+        after = ServerIndex.parse_cursor(sort, cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    page = await server_manager_task.find_servers(
+        gamemode=gamemode,
+        locale=locale,
+        game_version=game_version,
+        min_online=min_online,
+        max_online=max_online,
+        not_full=not_full,
+        sort=sort,
+        after=after,
+        limit=limit,
+    )
+    content = ServersListResponse(
+        online_servers=len(page),
+        online_players=sum(record.online for _, record in page),
+        servers={
+            server_uuid: ServerInfo(name=record.display_name, online=record.online, maxPlayers=record.max_players)
+            for server_uuid, record in page
+        },
+        next_cursor=ServerIndex.make_cursor(sort, *page[-1]) if len(page) == limit else None,
+        stats=await server_manager_task.get_stats(),
+        unreachable=server_manager_task.flag_unreachable(server_uuid for server_uuid, _ in page),
+    ).model_dump_json(by_alias=True)
+    return Response(content=content, media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+
+async def get_servers_stats() -> ServersStats:
+    return await server_manager_task.get_stats()
+
+
+async def get_servers_ranking(
+    limit: int = Query(default=10, ge=1, le=100),
+    server: Optional[UUID] = Query(default=None),
+    ) -> ServersRankingResponse:
+    def make_entry(rank: int, server_uuid: UUID, record: ServerRecord) -> ServerRankEntry:
+        return ServerRankEntry(
+            rank=rank,
+            key=server_uuid,
+            name=record.display_name,
+            online=record.online,
+            maxPlayers=record.max_players,
         )
-    return ServersListResponse(
-        online_servers=len(active_servers), online_players=player, servers=servers
+
+    ranking = await server_manager_task.get_ranking(limit)
+    response = ServersRankingResponse(
+        servers=[make_entry(rank, server_uuid, record) for rank, (server_uuid, record) in enumerate(ranking, 1)],
+    )
+    if server is not None:
+        ranked = await server_manager_task.get_rank(server)
+        if ranked is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        rank, record = ranked
+        response.server = make_entry(rank, server, record)
+    return response
+
+
+async def get_servers_events() -> StreamingResponse:
+    snapshot, subscriber = await servers_feed_task.subscribe()
+
+    async def stream():
+        try:
+            yield snapshot
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event
+        finally:
+            servers_feed_task.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 async def create_new_server(
     db_session: AsyncSession = Depends(database_session_depends),
+    redis_client: redis.Redis = Depends(redis_client_depends),
     form_data: ServerCreateFormRequest = Form(),
     access_payload: JwtAccessPayload = Depends(jwt_validator_depends),
 ) -> UUID:
@@ -58,58 +225,143 @@ async def create_new_server(
         owner_user_id=int(access_payload.sub), 
         form_data=form_data
         )
+    # Committed first, otherwise a worker could cache the settings from before the change
+    await db_session.commit()
+    await get_server_depends.invalidate(redis_client, server.uuid)
     return server.uuid
 
 # /api/servers/{server_uuid}
-async def get_server_info(server_info: ServerModel = Depends(GetServerDepends())):
+async def get_server_info(server_info: ServerModel = Depends(get_server_depends)):
     return ServerModel.model_dump(server_info, mode="json")
 
-async def update_server_settings(server_info: ServerModel = Depends(GetServerDepends())):
+async def update_server_settings(server_info: ServerModel = Depends(get_server_depends)):
+    # Has to call get_server_depends.invalidate after the commit, as create_new_server does
     raise NotImplementedError
 
 
-async def delete_server(server_info: ServerModel = Depends(GetServerDepends())):
+async def delete_server(server_info: ServerModel = Depends(get_server_depends)):
+    # Has to call get_server_depends.invalidate after the commit, as create_new_server does
     raise NotImplementedError
 
 
 async def server_hearbeat(
     server_uuid: UUID,
     server_info: ServerInfo,
-    server_data: ServerModel = Depends(GetServerDepends()),
+    server_data: ServerModel = Depends(get_server_depends),
 ) -> None:
     if not server_data.info.host:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
-    if await server_manager_task.get_server(server_uuid=server_uuid):
-        await server_manager_task.update_server(
-            server_uuid=server_uuid, online=server_info.online
-        )
-    else:
+    known = await server_manager_task.update_server(
+        server_uuid=server_uuid, online=server_info.online
+    )
+    await apply_heartbeat(server_uuid, server_info, server_data, known)
+        # Заголовок `Location` передается адрес созданного ресурса. Добавить возвращение UUID в заголовок
+
+
+async def servers_heartbeat(batch: ServersHeartbeatRequest) -> ServersHeartbeatResponse:
+    results: dict[UUID, ServerHeartbeatStatus] = {}
+    servers_data: dict[UUID, ServerModel] = {}
+    for server_uuid in batch.servers:
         try:
-            async with httpx.AsyncClient() as client:
-                response_manifest = await client.get(
-                    f"http://{server_data.info.host}:{server_data.info.main_port + 1}/manifest.json"
-                )
-                response_manifest.raise_for_status()
-        except httpx.HTTPStatusError as error:
-            raise HTTPException(
-                status_code=error.response.status_code, detail=str(error)
+            server_data = await get_server_depends(server_uuid)
+        except HTTPException:
+            results[server_uuid] = ServerHeartbeatStatus.not_found
+            continue
+        if not server_data.info.host:
+            results[server_uuid] = ServerHeartbeatStatus.forbidden
+            continue
+        servers_data[server_uuid] = server_data
+
+    known = await server_manager_task.update_servers(
+        {server_uuid: batch.servers[server_uuid].online for server_uuid in servers_data}
+    )
+    for server_uuid, server_data in servers_data.items():
+        results[server_uuid] = await apply_heartbeat(
+            server_uuid, batch.servers[server_uuid], server_data, known[server_uuid]
+        )
+    return ServersHeartbeatResponse(servers=results)
+
+
+async def server_heartbeat_channel(server_uuid: UUID, websocket: WebSocket) -> None:
+    # The server is resolved and authenticated with its secret (the Authorization header) once per
+    # connection. The first message is a full ServerInfo, later ones a bare online count or a full
+    # ServerInfo again. Only the online count of a registered server is updated, as with the HTTP heartbeat.
+    try:
+        server_data = await get_server_depends(server_uuid)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not server_data.info.host:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    secret = websocket.headers.get("authorization", None)
+    if not secret or not await authenticate_server(server_uuid, secret, get_client_ip_depends(websocket)):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    channel = await server_manager_task.open_channel(server_uuid)
+    server_info: Optional[ServerInfo] = None
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                # isdecimal alone lets through non-ASCII digits and numbers int() refuses
+                if message.isascii() and message.isdecimal() and len(message) <= 9 and server_info is not None:
+                    server_info = ServerInfo(
+                        name=server_info.name, online=int(message), maxPlayers=server_info.max_players
+                    )
+                else:
+                    server_info = ServerInfo.model_validate_json(message)
+            except (ValidationError, ValueError):
+                await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+                break
+            known = await server_manager_task.update_server(
+                server_uuid=server_uuid, online=server_info.online
             )
-        except httpx.RequestError:
-            raise HTTPException(status_code=400, detail="Server data is not correct")
+            await apply_heartbeat(server_uuid, server_info, server_data, known)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # No need to wait for the heartbeat expiry, a closed channel means the server is gone,
+        # unless it has already reconnected on a newer channel
+        if await server_manager_task.close_channel(server_uuid, channel) and server_info is not None:
+            await server_manager_task.remove_server(server_uuid)
 
-        manifest = ServerModsManifest.model_validate(response_manifest.json())
-        storage = ServerStorage(
+
+async def apply_heartbeat(
+    server_uuid: UUID,
+    server_info: ServerInfo,
+    server_data: ServerModel,
+    known: bool,
+) -> ServerHeartbeatStatus:
+    # Registers the server if the online update did not find it and keeps its manifest fetch going
+    if known:
+        record = await server_manager_task.get_server(server_uuid)
+        if record is None or record.manifest_hash is not None:
+            return ServerHeartbeatStatus.updated
+        heartbeat_status = ServerHeartbeatStatus.updated
+    else:
+        # The manifest is fetched in the background, the server is listed once it is attached
+        record = ServerRecord(
             display_name=server_info.name,
             host=server_data.info.host,
             port=server_data.info.main_port,
             online=server_info.online,
             max_players=server_info.max_players,
             gamemode=server_data.info.gamemode_type,
-            manifest=manifest,
+            locale=server_data.info.locale,
+            game_version=server_data.info.game_version,
         )
-        await server_manager_task.add_server(server_uuid=server_uuid, storage=storage)
-        # Заголовок `Location` передается адрес созданного ресурса. Добавить возвращение UUID в заголовок
+        await server_manager_task.add_server(server_uuid=server_uuid, record=record)
+        heartbeat_status = ServerHeartbeatStatus.registered
+    manifest_fetch_task.schedule(
+        server_uuid=server_uuid,
+        host=server_data.info.host,
+        port=server_data.info.main_port + 1,
+    )
+    return heartbeat_status
 
 
 async def get_server_online(server_uuid: UUID) -> int:
@@ -123,49 +375,158 @@ async def get_connect_info(server_uuid: UUID,
 ) -> ServerConnectResponse:
     if server := await server_manager_task.get_server(server_uuid):
         return ServerConnectResponse(
-            key=server_uuid, host=server.host, port=server.port
+            key=server_uuid, host=server.address, port=server.port
         )
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
 
+async def get_server_reachability(server_uuid: UUID) -> dict:
+    reachability = server_manager_task.get_reachability(server_uuid)
+    if reachability is None:
+        # Not probed yet, or probing is disabled
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return reachability._asdict()
+
+
+async def get_server_history(
+    server_uuid: UUID,
+    resolution: HistoryResolution = Query(default=HistoryResolution.minute),
+    db_session: AsyncSession = Depends(database_session_depends),
+) -> ServerHistoryResponse:
+    width, capacity = HISTORY_TIERS[resolution]
+    points = dict(online_history.points(server_uuid, resolution))
+    if settings.servers.history_persist and resolution != HistoryResolution.minute:
+        # Fill in what was recorded before the last restart, the in-memory buckets are newer
+        since = datetime.fromtimestamp((time.time() // width - capacity + 1) * width, tz=timezone.utc)
+        stored = await read_server_history(db_session, server_uuid, resolution, since)
+        points = {int(row.bucket_start.timestamp()): row.online for row in stored} | points
+    return ServerHistoryResponse(
+        resolution=resolution,
+        interval=width,
+        points=[
+            {"timestamp": datetime.fromtimestamp(timestamp, tz=timezone.utc), "online": online}
+            for timestamp, online in sorted(points.items())
+        ],
+    )
+
+
 async def get_manifest(
     server_uuid: UUID,
-):
-    if server := await server_manager_task.get_server(server_uuid):
-        return server.manifest
-    else:
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    server = await server_manager_task.get_server(server_uuid)
+    if not server:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    entry = await server_manager_task.get_manifest(server.manifest_hash) if server.manifest_hash else None
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Manifest is pending",
+            headers={"Retry-After": "1"},
+        )
+    headers = {"ETag": entry.etag}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.content, media_type="application/json", headers=headers)
 
 async def сreating_server_session(
     server_uuid: UUID,
     real_ip: IPv4Address = Depends(get_client_ip_depends),
-    db_session: AsyncSession = Depends(database_session_depends),
     redis_client: redis.Redis = Depends(redis_client_depends),
     authorization: str = Header(),
 ):
     user_id = await redis_client.get(name=f"session_token:{authorization}")
-    if user_id:
-        session = secrets.token_urlsafe()
-        await create_game_session(
-            session=db_session, 
-            user_id=int(user_id), 
-            server_uuid=server_uuid, 
-            session_token=session, 
-            user_ip=real_ip
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    signed = settings.servers.session_token_signed
+    if signed:
+        session, session_payload = create_game_session_token(
+            sub=user_id,
+            iss=project.name,
+            aud=str(server_uuid),
+            expire=settings.servers.session_token_ttl,
         )
+        session_id = ULID.from_str(session_payload.jti)
+    else:
+        session = secrets.token_urlsafe()
+        session_id = ULID()
+    # The row reaches Postgres through GameSessionWriteTask, for signed tokens it is only an audit
+    # record and the jti stands in for the token
+    await game_session_store.create(
+        GameSessionRecord(
+            session_id=session_id,
+            user_id=int(user_id),
+            server_uuid=server_uuid,
+            session_token=str(session_id) if signed else session,
+            reg_ip=real_ip,
+            create=datetime.now(timezone.utc),
+        ),
+        lookup=not signed,
+    )
     return {"session": session}
-        
+
 
 
 async def get_user_sessions(
     sessions: str,
-    server_data: Optional[ServerModel] = Depends(GetServerDepends()),
+    server_data: Optional[ServerModel] = Depends(get_server_depends),
     db_session: AsyncSession = Depends(database_session_depends),
 ):
     if not server_data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    game_session = await read_game_session_by_token(session=db_session, session_token=sessions)
+    if is_signed_session(sessions):
+        user_id = resolve_signed_session(sessions, server_data.uuid)
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return {"user":{"id":user_id}}
+    user_id = await game_session_store.get_user(sessions, server_data.uuid)
+    if user_id is not None:
+        return {"user":{"id":user_id}}
+    # Older than the Redis TTL
+    game_session = await read_game_session_by_token(
+        session=db_session, server_uuid=server_data.uuid, session_token=sessions
+    )
     if not game_session:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return {"user":{"id":game_session.user_id}}
+
+
+async def resolve_user_sessions(
+    batch: GameSessionsResolveRequest,
+    server_data: Optional[ServerModel] = Depends(get_server_depends),
+    db_session: AsyncSession = Depends(database_session_depends),
+) -> GameSessionsResolveResponse:
+    if not server_data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    users: dict[str, Optional[int]] = {}
+    opaque: list[str] = []
+    for token in batch.sessions:
+        if is_signed_session(token):
+            users[token] = resolve_signed_session(token, server_data.uuid)
+        else:
+            opaque.append(token)
+    if opaque:
+        found = await game_session_store.get_users(opaque, server_data.uuid)
+        missing = [token for token in opaque if token not in found]
+        if missing:
+            # One query for every token that already left Redis
+            found.update(await read_game_session_users_by_tokens(session=db_session, server_uuid=server_data.uuid, session_tokens=missing))
+        for token in opaque:
+            users[token] = found.get(token, None)
+    return GameSessionsResolveResponse(users=users)
+
+
+def is_signed_session(token: str) -> bool:
+    # token_urlsafe never contains dots, a JWT always has two
+    return token.count(".") == 2
+
+
+def resolve_signed_session(token: str, server_uuid: UUID) -> Optional[int]:
+    try:
+        session_payload = jwt_decode(token=token, iss=project.name, aud=str(server_uuid))
+    except PyJWTError:
+        return None
+    if not isinstance(session_payload, JwtGameSessionPayload):
+        return None
+    return int(session_payload.sub)
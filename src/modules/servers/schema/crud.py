@@ -1,13 +1,15 @@
 from typing import Optional
+from datetime import datetime
 from ipaddress import IPv4Address
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
+from ulid import ULID
 
 from shared.enum import ServerGamemode, AccessStatus
 
 
-__all__ = ['ServerPublicInfoModel', 'ServerModel']
+__all__ = ['ServerPublicInfoModel', 'ServerModel', 'GameSessionRecord']
 
 
 crud_config_dict = ConfigDict(from_attributes=True, extra="ignore")
@@ -34,4 +36,15 @@ class ServerModel(BaseModel):
     uuid: UUID
     owner_user_id: int
     status: AccessStatus
-    info: ServerPublicInfoModel
\ No newline at end of file
+    info: ServerPublicInfoModel
+
+
+class GameSessionRecord(BaseModel):
+    model_config = crud_config_dict
+
+    session_id: ULID
+    user_id: int
+    server_uuid: UUID
+    session_token: str
+    reg_ip: IPv4Address
+    create: datetime
\ No newline at end of file
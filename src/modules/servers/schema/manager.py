@@ -1,18 +1,101 @@
+from typing import Optional, Union, NamedTuple
 from ipaddress import IPv4Address
 
-from pydantic import BaseModel, Field
+import orjson
 
 from shared.enum.server import ServerGamemode
 
-from . import ServerModsManifest
+__all__ = ['ServerRecord', 'ServerReachability']
 
-__all__ = ['ServerStorage']
+class ServerRecord:
+    # Internal registry entry, API schemas are only built from it when a response is serialized
+    __slots__ = (
+        "display_name",
+        "host",
+        "port",
+        "online",
+        "max_players",
+        "gamemode",
+        "locale",
+        "game_version",
+        "manifest_hash",
+    )
 
-class ServerStorage(BaseModel):
-    display_name: str = Field(max_length=64)
-    host: IPv4Address
-    port: int = Field(ge=1024, le=65535)
-    online: int = Field(ge=0, le=1500)
-    max_players: int = Field(ge=0, le=1500)
-    gamemode: ServerGamemode
-    manifest: ServerModsManifest
\ No newline at end of file
+    def __init__(
+        self,
+        display_name: str,
+        host: Union[IPv4Address, int],
+        port: int,
+        online: int,
+        max_players: int,
+        gamemode: ServerGamemode,
+        locale: Optional[str] = None,
+        game_version: Optional[str] = None,
+        manifest_hash: Optional[str] = None,
+        ) -> None:
+        self.display_name = display_name
+        # Packed IPv4, an IPv4Address object per server costs more than the rest of the record
+        self.host = int(host)
+        self.port = port
+        self.online = online
+        self.max_players = max_players
+        self.gamemode = gamemode
+        self.locale = locale
+        self.game_version = game_version
+        # Digest of the manifest in the manifest store, None while it is still being fetched
+        self.manifest_hash = manifest_hash
+
+    def __repr__(self) -> str:
+        return f"ServerRecord(display_name={self.display_name!r}, address={self.address}:{self.port}, online={self.online})"
+
+    @property
+    def address(self) -> IPv4Address:
+        return IPv4Address(self.host)
+
+    def copy(self) -> "ServerRecord":
+        return ServerRecord(
+            display_name=self.display_name,
+            host=self.host,
+            port=self.port,
+            online=self.online,
+            max_players=self.max_players,
+            gamemode=self.gamemode,
+            locale=self.locale,
+            game_version=self.game_version,
+            manifest_hash=self.manifest_hash,
+        )
+
+    def to_json(self) -> bytes:
+        return orjson.dumps({
+            "display_name": self.display_name,
+            "host": self.host,
+            "port": self.port,
+            "online": self.online,
+            "max_players": self.max_players,
+            "gamemode": self.gamemode,
+            "locale": self.locale,
+            "game_version": self.game_version,
+            "manifest_hash": self.manifest_hash,
+        })
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "ServerRecord":
+        fields = orjson.loads(data)
+        return cls(
+            display_name=fields["display_name"],
+            host=fields["host"],
+            port=fields["port"],
+            online=fields["online"],
+            max_players=fields["max_players"],
+            gamemode=ServerGamemode(fields["gamemode"]),
+            locale=fields.get("locale", None),
+            game_version=fields.get("game_version", None),
+            manifest_hash=fields["manifest_hash"],
+        )
+
+
+class ServerReachability(NamedTuple):
+    reachable: bool
+    # Milliseconds of the last successful probe
+    latency: Optional[float]
+    checked_at: float
@@ -1,12 +1,21 @@
 from typing import Optional
+from uuid import UUID
 from ipaddress import IPv4Address
 
 from pydantic import BaseModel, Field
 
-__all__ = ['ServerCreateFormRequest']
+from .common import ServerInfo
+
+__all__ = ['ServerCreateFormRequest', 'ServersHeartbeatRequest', 'GameSessionsResolveRequest']
 
 class ServerCreateFormRequest(BaseModel):
     display_name: str = Field(max_length=64)
     description: Optional[str] = Field(max_length=2048)
     host: Optional[IPv4Address] = Field(default=None)
-    main_port: int = Field(ge=0, le=65535)
\ No newline at end of file
+    main_port: int = Field(ge=0, le=65535)
+
+class ServersHeartbeatRequest(BaseModel):
+    servers: dict[UUID, ServerInfo] = Field(min_length=1, max_length=1000)
+
+class GameSessionsResolveRequest(BaseModel):
+    sessions: list[str] = Field(min_length=1, max_length=1000)
@@ -1,23 +1,73 @@
 from typing import Optional
+from datetime import datetime
 
 from uuid import UUID
 from ipaddress import IPv4Address
 
 from pydantic import BaseModel, Field
 
+from shared.enum import ServerHeartbeatStatus, HistoryResolution, ServerGamemode
 from .common import ServerInfo
 
-__all__ = ['ServersListResponse', 'ServerConnectResponse']
+__all__ = ['ServersGroupStats', 'ServersStats', 'ServersListResponse', 'ServerConnectResponse', 'ServersHeartbeatResponse', 'ServerHistoryResponse', 'ServerRankEntry', 'ServersRankingResponse', 'GameSessionsResolveResponse']
 
 
 
+class ServersGroupStats(BaseModel):
+    servers: int = Field(ge=0)
+    players: int = Field(ge=0)
+
+
+class ServersStats(BaseModel):
+    online_servers: int = Field(ge=0)
+    online_players: int = Field(ge=0)
+    gamemodes: dict[ServerGamemode, ServersGroupStats] = Field(default={})
+    locales: dict[str, ServersGroupStats] = Field(default={})
+    game_versions: dict[str, ServersGroupStats] = Field(default={})
+
+
 class ServersListResponse(BaseModel):
     online_servers: Optional[int] = Field(default=None, ge=0, )
     online_players: Optional[int] = Field(default=None, ge=0, )
     servers: dict[UUID, ServerInfo] = Field(default={})
+    next_cursor: Optional[str] = Field(default=None)
+    stats: Optional[ServersStats] = Field(default=None)
+    unreachable: Optional[list[UUID]] = Field(default=None, description="Listed servers that failed the reachability probe")
 
 
 class ServerConnectResponse(BaseModel):
     key: UUID
     host: IPv4Address
-    port: int = Field(ge=1024, le=65535)
\ No newline at end of file
+    port: int = Field(ge=1024, le=65535)
+
+
+class ServersHeartbeatResponse(BaseModel):
+    servers: dict[UUID, ServerHeartbeatStatus]
+
+
+class ServerHistoryPoint(BaseModel):
+    timestamp: datetime
+    online: int
+
+
+class ServerHistoryResponse(BaseModel):
+    resolution: HistoryResolution
+    interval: int = Field(description="Bucket width in seconds")
+    points: list[ServerHistoryPoint]
+
+
+class ServerRankEntry(BaseModel):
+    rank: int = Field(ge=1)
+    key: UUID
+    name: str
+    online: int = Field(ge=0)
+    max_players: int = Field(alias="maxPlayers", ge=0)
+
+
+class ServersRankingResponse(BaseModel):
+    servers: list[ServerRankEntry]
+    server: Optional[ServerRankEntry] = Field(default=None)
+
+
+class GameSessionsResolveResponse(BaseModel):
+    users: dict[str, Optional[int]] = Field(description="User id per session token, null when the token is unknown")
@@ -1,3 +1,16 @@
 from .crud_server import *
 from .task_server_manager import ServerManagementTask
+from .server_index import ServerIndex
+from .server_aggregates import ServerAggregates
+from .redis_registry import RedisServerRegistry
+from .manifest_fetcher import ManifestFetcher
+from .task_manifest_fetch import ManifestFetchTask
+from .task_server_probe import ServerProbeTask
+from .task_servers_feed import ServersFeedTask
+from .online_history import OnlineHistory, HISTORY_TIERS
+from .task_online_history import OnlineHistoryTask
+from .server_cache import ServerCache, ServerCacheInvalidationTask
 from .depends_get_server import GetServerDepends
+from .server_credential import authenticate_server
+from .game_session_store import GameSessionStore
+from .task_game_session_write import GameSessionWriteTask
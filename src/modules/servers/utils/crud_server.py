@@ -1,20 +1,26 @@
-from ipaddress import IPv4Address
+from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
-from ulid import ULID
 
-from shared.models import Server, ServerPublicInfo, GameSession
-from ..schema import ServerCreateFormRequest
+from shared.enum import HistoryResolution
+from shared.models import Server, ServerPublicInfo, ServerCredential, GameSession, ServerOnlineHistory
+from ..schema import ServerCreateFormRequest, GameSessionRecord
 
 __all__ = [
     "create_server_by_form",
     "read_server_by_UUID",
-    "create_game_session",
-    'read_game_session_by_token'
+    "read_server_credential",
+    "create_game_sessions",
+    'read_game_session_by_token',
+    'read_game_session_users_by_tokens',
+    "upsert_server_history",
+    "read_server_history",
 ]
 
 async def create_server_by_form(
@@ -41,28 +47,69 @@ async def read_server_by_UUID(
     )
     return server
 
+async def read_server_credential(session: AsyncSession, server_uuid: UUID) -> Optional[ServerCredential]:
+    return await session.get(ServerCredential, server_uuid)
+
 # Game Session
 # Create
-async def create_game_session(
-    session: AsyncSession,
-    user_id: int,
-    server_uuid: UUID, 
-    session_token: str,
-    user_ip: IPv4Address
-) -> GameSession:
-    game_session = GameSession(
-        session_id=ULID(),
-        user_id=user_id,
-        server_uuid=server_uuid,
-        session_token=session_token,
-        reg_ip=user_ip
-    )
-    session.add(game_session)
-    await session.flush()
-    return game_session
+async def create_game_sessions(session: AsyncSession, records: list[GameSessionRecord]) -> None:
+    # Multi-row insert, replaying a batch after a failed commit is harmless
+    statement = insert(GameSession).values([record.model_dump() for record in records])
+    await session.execute(statement.on_conflict_do_nothing(index_elements=[GameSession.session_id]))
 
-async def read_game_session_by_token(session: AsyncSession, session_token: str)->Optional[GameSession]:
+async def read_game_session_by_token(
+    session: AsyncSession, server_uuid: UUID, session_token: str
+) -> Optional[GameSession]:
     return await session.scalar(
         select(GameSession)
-        .where(GameSession.session_token == session_token)
+        .where(
+            GameSession.server_uuid == server_uuid,
+            GameSession.session_token == session_token,
+        )
+    )
+
+async def read_game_session_users_by_tokens(
+    session: AsyncSession, server_uuid: UUID, session_tokens: list[str]
+) -> dict[str, int]:
+    # One array parameter instead of an IN list, so the statement is the same for any batch size
+    result = await session.execute(
+        select(GameSession.session_token, GameSession.user_id)
+        .where(
+            GameSession.server_uuid == server_uuid,
+            GameSession.session_token == any_(bindparam("session_tokens", type_=ARRAY(String))),
+        ),
+        {"session_tokens": session_tokens},
+    )
+    return {session_token: user_id for session_token, user_id in result.all()}
+
+# Online history
+async def upsert_server_history(
+    session: AsyncSession, rows: list[tuple[UUID, HistoryResolution, int, int]]
+) -> None:
+    statement = insert(ServerOnlineHistory).values([
+        {
+            "server_uuid": server_uuid,
+            "resolution": resolution,
+            "bucket_start": datetime.fromtimestamp(timestamp, tz=timezone.utc),
+            "online": online,
+        }
+        for server_uuid, resolution, timestamp, online in rows
+    ])
+    await session.execute(statement.on_conflict_do_update(
+        index_elements=["server_uuid", "resolution", "bucket_start"],
+        set_={"online": statement.excluded.online},
+    ))
+
+async def read_server_history(
+    session: AsyncSession, server_uuid: UUID, resolution: HistoryResolution, since: datetime
+) -> list[ServerOnlineHistory]:
+    result = await session.scalars(
+        select(ServerOnlineHistory)
+        .where(
+            ServerOnlineHistory.server_uuid == server_uuid,
+            ServerOnlineHistory.resolution == resolution,
+            ServerOnlineHistory.bucket_start >= since,
+        )
+        .order_by(ServerOnlineHistory.bucket_start)
     )
+    return list(result)
@@ -2,38 +2,51 @@ from typing import Optional
 
 import redis
 from uuid import UUID
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
 
-from shared.depends import redis_client_depends, database_session_depends
+from core import database_manager, redis_manager
 from .crud_server import read_server_by_UUID
+from .server_cache import ServerCache, INVALIDATE_CHANNEL
 from ..schema import ServerModel
 
 class GetServerDepends:
     def __init__(
-        self, 
+        self,
         cache_ttl: int = 1800,
+        local_cache: Optional[ServerCache] = None,
         ) -> None:
         self._ttl_expire = cache_ttl
+        self._local_cache = local_cache
 
-    async def __call__(
-        self,
-        server_uuid: UUID,
-        redis_client: redis.Redis = Depends(redis_client_depends),
-        db_session: AsyncSession = Depends(database_session_depends),
-    ) -> Optional[ServerModel]:
-        cache_data = await redis_client.get(name=f"server:{str(server_uuid)}")
-        if cache_data:
-            server_data = ServerModel.model_validate_json(cache_data)
-            await redis_client.expire(f"server:{str(server_uuid)}", self._ttl_expire)
-        else:
-            server_db = await read_server_by_UUID(db_session, server_uuid)
-            if server_db:
-                server_data = ServerModel.model_validate(server_db)
-                await redis_client.set(name=f"server:{str(server_uuid)}", value=server_data.model_dump_json())
+    async def __call__(self, server_uuid: UUID) -> Optional[ServerModel]:
+        # Redis and the database are only touched on an L1 miss
+        if self._local_cache is not None:
+            server_data = self._local_cache.get(server_uuid)
+            if server_data:
+                return server_data
+
+        async with redis_manager.get_client_context() as redis_client:
+            cache_data = await redis_client.getex(name=f"server:{str(server_uuid)}", ex=self._ttl_expire)
+            if cache_data:
+                server_data = ServerModel.model_validate_json(cache_data)
             else:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+                async with database_manager.get_session_context() as db_session:
+                    server_db = await read_server_by_UUID(db_session, server_uuid)
+                    if server_db:
+                        server_data = ServerModel.model_validate(server_db)
+                    else:
+                        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+                await redis_client.set(
+                    name=f"server:{str(server_uuid)}", value=server_data.model_dump_json(), ex=self._ttl_expire
+                )
 
+        if self._local_cache is not None:
+            self._local_cache.put(server_uuid, server_data)
         return server_data
 
-
+    async def invalidate(self, redis_client: redis.Redis, server_uuid: UUID) -> None:
+        # Must be called after every change of the server settings, every worker drops its L1 entry
+        await redis_client.delete(f"server:{str(server_uuid)}")
+        if self._local_cache is not None:
+            self._local_cache.discard(server_uuid)
+        await redis_client.publish(INVALIDATE_CHANNEL, str(server_uuid))
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterator, Optional, TypeVar
+
+__all__ = ["ExpiryIndex"]
+
+K = TypeVar("K", bound=Hashable)
+
+
+class ExpiryIndex(Generic[K]):
+    """Deadline queue for keys that share a single TTL.
+
+    With one TTL for every key, deadlines arrive in the same order as refreshes, so
+    a refresh just moves the key to the tail and a sweep pops from the head until
+    the first deadline that has not passed. Refresh is O(1) and a sweep touches only
+    expired keys. A min-heap with lazy deletion would leave a stale entry behind on
+    every heartbeat and the sweep would have to pop them all.
+    """
+
+    def __init__(self) -> None:
+        self._deadlines: OrderedDict[K, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._deadlines
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._deadlines)
+
+    def get(self, key: K) -> Optional[float]:
+        return self._deadlines.get(key, None)
+
+    def push(self, key: K, expire_at: float) -> None:
+        # A deadline earlier than the tail (clock step back) only delays the sweep of later keys
+        self._deadlines[key] = expire_at
+        self._deadlines.move_to_end(key)
+
+    def discard(self, key: K) -> None:
+        self._deadlines.pop(key, None)
+
+    def pop_expired(self, now: float) -> list[K]:
+        expired: list[K] = []
+        for key, expire_at in self._deadlines.items():
+            if expire_at >= now:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._deadlines[key]
+        return expired
+
+    def clear(self) -> None:
+        self._deadlines.clear()
@@ -0,0 +1,64 @@
+from collections.abc import Iterable
+from typing import Optional
+from uuid import UUID
+
+import orjson
+
+from core.cache.redis_manager import RedisManager
+from ..schema import GameSessionRecord
+
+__all__ = ["GameSessionStore"]
+
+SESSION_KEY = "game_session:{token}"
+PENDING_KEY = "game_sessions:pending"
+
+
+class GameSessionStore:
+    # Sessions are served from Redis while they are fresh, Postgres gets them later in batches
+    # from the pending list (see GameSessionWriteTask)
+    def __init__(self, redis_manager: RedisManager, ttl: float = 86400.0) -> None:
+        self._redis = redis_manager
+        self._ttl = int(ttl)
+
+    async def create(self, record: GameSessionRecord, lookup: bool = True) -> None:
+        # Signed tokens are verified by the game servers themselves and only need the audit row
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=True) as pipe:
+                if lookup:
+                    pipe.set(
+                        SESSION_KEY.format(token=record.session_token),
+                        orjson.dumps([record.user_id, str(record.server_uuid)]),
+                        ex=self._ttl,
+                    )
+                pipe.rpush(PENDING_KEY, record.model_dump_json())
+                await pipe.execute()
+
+    async def get_user(self, session_token: str, server_uuid: UUID) -> Optional[int]:
+        users = await self.get_users([session_token], server_uuid)
+        return users.get(session_token, None)
+
+    async def get_users(self, session_tokens: list[str], server_uuid: UUID) -> dict[str, int]:
+        if not session_tokens:
+            return {}
+        async with self._redis.get_client_context() as client:
+            values = await client.mget([SESSION_KEY.format(token=token) for token in session_tokens])
+        users: dict[str, int] = {}
+        for token, value in zip(session_tokens, values):
+            if value is None:
+                continue
+            user_id, server = orjson.loads(value)
+            if server == str(server_uuid):
+                users[token] = user_id
+        return users
+
+    async def pop_pending(self, count: int) -> list[GameSessionRecord]:
+        async with self._redis.get_client_context() as client:
+            values = await client.lpop(PENDING_KEY, count)
+        return [GameSessionRecord.model_validate_json(value) for value in values or ()]
+
+    async def requeue(self, records: Iterable[GameSessionRecord]) -> None:
+        values = [record.model_dump_json() for record in records]
+        if not values:
+            return
+        async with self._redis.get_client_context() as client:
+            await client.lpush(PENDING_KEY, *reversed(values))
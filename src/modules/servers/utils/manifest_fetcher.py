@@ -0,0 +1,36 @@
+import asyncio
+from ipaddress import IPv4Address
+from uuid import UUID
+
+from core.http.httpx_manager import HttpxManager
+from ..schema import ServerModsManifest
+
+__all__ = ["ManifestFetcher"]
+
+
+class ManifestFetcher:
+    def __init__(self, http_manager: HttpxManager) -> None:
+        self._http = http_manager
+        self._in_flight: dict[UUID, asyncio.Future[ServerModsManifest]] = {}
+
+    async def fetch(self, server_uuid: UUID, host: IPv4Address, port: int) -> ServerModsManifest:
+        # Concurrent fetches for one server share a single request
+        future = self._in_flight.get(server_uuid, None)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(host=host, port=port))
+            self._in_flight[server_uuid] = future
+            future.add_done_callback(lambda done: self._forget(server_uuid, done))
+        # A cancelled waiter must not cancel the request other waiters are sharing
+        return await asyncio.shield(future)
+
+    async def _fetch(self, host: IPv4Address, port: int) -> ServerModsManifest:
+        response = await self._http.get(f"http://{host}:{port}/manifest.json")
+        response.raise_for_status()
+        return ServerModsManifest.model_validate_json(response.content)
+
+    def _forget(self, server_uuid: UUID, future: asyncio.Future) -> None:
+        if self._in_flight.get(server_uuid, None) is future:
+            del self._in_flight[server_uuid]
+        if not future.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away
+            future.exception()
@@ -0,0 +1,58 @@
+from hashlib import sha256
+from typing import Iterable, NamedTuple, Optional
+
+import orjson
+
+from ..schema import ServerModsManifest
+
+__all__ = ["ManifestEntry", "ManifestStore"]
+
+
+class ManifestEntry(NamedTuple):
+    digest: str
+    etag: str
+    content: bytes
+
+
+class ManifestStore:
+    # Servers running the same mod set share one entry, keyed by the hash of the canonical manifest
+    def __init__(self) -> None:
+        self._entries: dict[str, ManifestEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, digest: object) -> bool:
+        return digest in self._entries
+
+    @staticmethod
+    def make_digest(manifest: ServerModsManifest) -> str:
+        canonical = orjson.dumps({
+            "mods": [[mod.filename, mod.crc32, int(mod.size)] for mod in manifest.mods],
+            "loadOrder": manifest.load_order,
+            "versionMajor": manifest.version,
+        })
+        return sha256(canonical).hexdigest()
+
+    def put(self, manifest: ServerModsManifest) -> ManifestEntry:
+        digest = self.make_digest(manifest)
+        entry = self._entries.get(digest, None)
+        if entry is None:
+            entry = self.put_content(digest, manifest.model_dump_json(by_alias=True).encode())
+        return entry
+
+    def put_content(self, digest: str, content: bytes) -> ManifestEntry:
+        entry = self._entries.get(digest, None)
+        if entry is None:
+            entry = self._entries[digest] = ManifestEntry(digest=digest, etag=f'"{digest}"', content=content)
+        return entry
+
+    def get(self, digest: str) -> Optional[ManifestEntry]:
+        return self._entries.get(digest, None)
+
+    def retain(self, digests: Iterable[Optional[str]]) -> int:
+        keep = set(digests)
+        unused = [digest for digest in self._entries if digest not in keep]
+        for digest in unused:
+            del self._entries[digest]
+        return len(unused)
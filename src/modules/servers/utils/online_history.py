@@ -0,0 +1,125 @@
+from array import array
+from collections.abc import Iterator
+from typing import Optional
+from uuid import UUID
+
+from shared.enum import HistoryResolution
+
+__all__ = ["OnlineHistory", "HISTORY_TIERS"]
+
+# Bucket width in seconds and number of buckets kept in memory for every resolution
+HISTORY_TIERS: dict[HistoryResolution, tuple[int, int]] = {
+    HistoryResolution.minute: (60, 1440),
+    HistoryResolution.hour: (3600, 168),
+    HistoryResolution.day: (86400, 365),
+}
+
+# Online is capped at 1500, so unsigned 16-bit slots fit and the max value marks a bucket without samples
+EMPTY = 0xFFFF
+
+
+class HistoryTier:
+    __slots__ = ("width", "values", "head", "flushed", "_sum", "_count")
+
+    def __init__(self, width: int, capacity: int) -> None:
+        self.width = width
+        self.values = array("H", [EMPTY]) * capacity
+        # Bucket number (timestamp // width) currently being averaged
+        self.head: Optional[int] = None
+        # Last bucket written to Postgres, the head itself is rewritten on every flush
+        self.flushed: Optional[int] = None
+        self._sum = 0
+        self._count = 0
+
+    def add(self, timestamp: float, online: int) -> None:
+        bucket = int(timestamp // self.width)
+        capacity = len(self.values)
+        if self.head is None or bucket > self.head:
+            if self.head is not None:
+                for skipped in range(max(self.head + 1, bucket - capacity + 1), bucket):
+                    self.values[skipped % capacity] = EMPTY
+            self.head = bucket
+            self._sum = self._count = 0
+        elif bucket < self.head:
+            return
+        self._sum += online
+        self._count += 1
+        self.values[bucket % capacity] = self._sum // self._count
+
+    def points(self, since: Optional[int] = None) -> Iterator[tuple[int, int]]:
+        # (bucket start timestamp, average online), oldest first
+        if self.head is None:
+            return
+        capacity = len(self.values)
+        first = self.head - capacity + 1
+        if since is not None:
+            first = max(first, since)
+        for bucket in range(first, self.head + 1):
+            value = self.values[bucket % capacity]
+            if value != EMPTY:
+                yield bucket * self.width, value
+
+
+class ServerHistory:
+    __slots__ = ("tiers", "last_sample")
+
+    def __init__(self) -> None:
+        self.tiers = {resolution: HistoryTier(width, capacity) for resolution, (width, capacity) in HISTORY_TIERS.items()}
+        self.last_sample = 0.0
+
+    def add(self, timestamp: float, online: int) -> None:
+        for tier in self.tiers.values():
+            tier.add(timestamp, online)
+        self.last_sample = timestamp
+
+
+class OnlineHistory:
+    # Fixed memory per server: every tier is a preallocated ring of 16-bit averages
+    def __init__(self) -> None:
+        self._servers: dict[UUID, ServerHistory] = {}
+
+    def __len__(self) -> int:
+        return len(self._servers)
+
+    def __contains__(self, server_uuid: object) -> bool:
+        return server_uuid in self._servers
+
+    def add(self, server_uuid: UUID, timestamp: float, online: int) -> None:
+        history = self._servers.get(server_uuid, None)
+        if history is None:
+            history = self._servers[server_uuid] = ServerHistory()
+        history.add(timestamp, online)
+
+    def points(self, server_uuid: UUID, resolution: HistoryResolution) -> list[tuple[int, int]]:
+        history = self._servers.get(server_uuid, None)
+        if history is None:
+            return []
+        return list(history.tiers[resolution].points())
+
+    def collect_unflushed(
+        self, resolutions: tuple[HistoryResolution, ...]
+        ) -> tuple[list[tuple[UUID, HistoryResolution, int, int]], list[tuple[HistoryTier, int]]]:
+        # Everything after the last flushed bucket, including the partial head bucket. The marks are
+        # applied with mark_flushed once the rows are stored, so a failed flush is retried in full.
+        rows = []
+        marks = []
+        for server_uuid, history in self._servers.items():
+            for resolution in resolutions:
+                tier = history.tiers[resolution]
+                if tier.head is None:
+                    continue
+                since = tier.flushed + 1 if tier.flushed is not None else None
+                rows.extend((server_uuid, resolution, timestamp, online) for timestamp, online in tier.points(since))
+                marks.append((tier, tier.head - 1))
+        return rows, marks
+
+    @staticmethod
+    def mark_flushed(marks: list[tuple[HistoryTier, int]]) -> None:
+        for tier, bucket in marks:
+            tier.flushed = bucket
+
+    def evict_idle(self, before: float) -> int:
+        idle = [server for server, history in self._servers.items() if history.last_sample < before]
+        for server in idle:
+            del self._servers[server]
+        return len(idle)
@@ -0,0 +1,382 @@
+from typing import Optional
+from collections.abc import Collection, Iterable, Mapping
+from uuid import UUID
+
+import orjson
+
+from core.cache.redis_manager import RedisManager
+from ..schema import ServerRecord, ServerReachability
+
+__all__ = ["RedisServerRegistry", "MANIFEST_TTL"]
+
+STORAGE_KEY = "servers:storage"
+ONLINE_KEY = "servers:online"
+EXPIRES_KEY = "servers:expires"
+VERSION_KEY = "servers:version"
+RANKING_KEY = "servers:ranking"
+CHANGES_KEY = "servers:changes"
+CHANGES_FLOOR_KEY = "servers:changes:floor"
+# Versions kept in the changelog, a worker that falls further behind reloads everything
+CHANGES_RETAIN = 100000
+MANIFEST_KEY = "servers:manifest:{digest}"
+MANIFEST_TTL = 86400
+REACHABILITY_KEY = "servers:reachability"
+LEASE_KEY = "servers:lease:{name}"
+CHANNEL_KEY = "servers:channel:{uuid}"
+CHANNEL_TTL = 86400
+
+# The ranking sorted set holds only the listed servers (the ones with a manifest), scored by online.
+# Every change bumps the version and records the server in the changelog sorted set, scored by
+# that version, so workers fetch only the servers changed since the version they hold.
+
+# KEYS: storage, online, expires, version, ranking, changes | ARGV: uuid, record json, online, expire_at, listed
+ADD_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[1])
+if ARGV[5] == '1' then
+    redis.call('ZADD', KEYS[5], ARGV[3], ARGV[1])
+else
+    redis.call('ZREM', KEYS[5], ARGV[1])
+end
+local version = redis.call('INCR', KEYS[4])
+redis.call('ZADD', KEYS[6], version, ARGV[1])
+return version
+"""
+
+# KEYS: storage, online, expires, ranking, version, changes | ARGV: expire_at, uuid, online, uuid, online...
+TOUCH_SCRIPT = """
+local touched = {}
+local changed = {}
+for i = 2, #ARGV, 2 do
+    if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 then
+        if redis.call('HGET', KEYS[2], ARGV[i]) ~= ARGV[i + 1] then
+            redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+            redis.call('ZADD', KEYS[4], 'XX', ARGV[i + 1], ARGV[i])
+            changed[#changed + 1] = ARGV[i]
+        end
+        redis.call('ZADD', KEYS[3], ARGV[1], ARGV[i])
+        touched[#touched + 1] = 1
+    else
+        touched[#touched + 1] = 0
+    end
+end
+if #changed > 0 then
+    local version = redis.call('INCR', KEYS[5])
+    for _, uuid in ipairs(changed) do
+        redis.call('ZADD', KEYS[6], version, uuid)
+    end
+end
+return touched
+"""
+
+# KEYS: storage, version, online, ranking, changes | ARGV: uuid, record json, listed
+REPLACE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if ARGV[3] == '1' then
+    redis.call('ZADD', KEYS[4], redis.call('HGET', KEYS[3], ARGV[1]) or 0, ARGV[1])
+else
+    redis.call('ZREM', KEYS[4], ARGV[1])
+end
+redis.call('ZADD', KEYS[5], redis.call('INCR', KEYS[2]), ARGV[1])
+return 1
+"""
+
+# KEYS: storage, online, expires, version, ranking, changes | ARGV: uuid...
+REMOVE_SCRIPT = """
+local removed = {}
+for _, uuid in ipairs(ARGV) do
+    if redis.call('HDEL', KEYS[1], uuid) == 1 then
+        removed[#removed + 1] = uuid
+    end
+    redis.call('HDEL', KEYS[2], uuid)
+    redis.call('ZREM', KEYS[3], uuid)
+    redis.call('ZREM', KEYS[5], uuid)
+end
+if #removed > 0 then
+    local version = redis.call('INCR', KEYS[4])
+    for _, uuid in ipairs(removed) do
+        redis.call('ZADD', KEYS[6], version, uuid)
+    end
+end
+return #removed
+"""
+
+# KEYS: storage, online, expires, version, ranking, changes, changes floor | ARGV: now, retain
+SWEEP_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+for _, uuid in ipairs(expired) do
+    redis.call('HDEL', KEYS[1], uuid)
+    redis.call('HDEL', KEYS[2], uuid)
+    redis.call('ZREM', KEYS[3], uuid)
+    redis.call('ZREM', KEYS[5], uuid)
+end
+local version = tonumber(redis.call('GET', KEYS[4]) or '0')
+if #expired > 0 then
+    version = redis.call('INCR', KEYS[4])
+    for _, uuid in ipairs(expired) do
+        redis.call('ZADD', KEYS[6], version, uuid)
+    end
+end
+local floor = version - tonumber(ARGV[2])
+if floor > tonumber(redis.call('GET', KEYS[7]) or '0') then
+    redis.call('ZREMRANGEBYSCORE', KEYS[6], '-inf', floor)
+    redis.call('SET', KEYS[7], floor)
+end
+return expired
+"""
+
+# KEYS: version, changes floor, changes, storage, online | ARGV: since
+CHANGES_SCRIPT = """
+local version = tonumber(redis.call('GET', KEYS[1]) or '0')
+local since = tonumber(ARGV[1])
+local result = {version, 1}
+if version == since then
+    return result
+end
+if since < tonumber(redis.call('GET', KEYS[2]) or '0') or since > version then
+    -- Trimmed past the caller, or the registry was reset
+    result[2] = 0
+    return result
+end
+for _, uuid in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '(' .. ARGV[1], '+inf')) do
+    result[#result + 1] = uuid
+    result[#result + 1] = redis.call('HGET', KEYS[4], uuid) or ''
+    result[#result + 1] = redis.call('HGET', KEYS[5], uuid) or ''
+end
+return result
+"""
+
+# KEYS: lease | ARGV: token, ttl ms
+LEASE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# KEYS: channel | ARGV: token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: ranking, storage | ARGV: limit
+RANKING_SCRIPT = """
+local top = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+local result = {}
+for i = 1, #top, 2 do
+    result[#result + 1] = top[i]
+    result[#result + 1] = top[i + 1]
+    result[#result + 1] = redis.call('HGET', KEYS[2], top[i]) or ''
+end
+return result
+"""
+
+
+# Every mutation is a single Lua script, so workers never see a half-registered server
+class RedisServerRegistry:
+    def __init__(self, redis_manager: RedisManager) -> None:
+        self._redis = redis_manager
+        self._keys = [STORAGE_KEY, ONLINE_KEY, EXPIRES_KEY, VERSION_KEY, RANKING_KEY, CHANGES_KEY]
+        # Hashed once here, every call sends only the sha and loads the source again after a SCRIPT FLUSH
+        self._add_script = redis_manager.register_script(ADD_SCRIPT)
+        self._touch_script = redis_manager.register_script(TOUCH_SCRIPT)
+        self._replace_script = redis_manager.register_script(REPLACE_SCRIPT)
+        self._remove_script = redis_manager.register_script(REMOVE_SCRIPT)
+        self._sweep_script = redis_manager.register_script(SWEEP_SCRIPT)
+        self._changes_script = redis_manager.register_script(CHANGES_SCRIPT)
+        self._lease_script = redis_manager.register_script(LEASE_SCRIPT)
+        self._release_script = redis_manager.register_script(RELEASE_SCRIPT)
+        self._ranking_script = redis_manager.register_script(RANKING_SCRIPT)
+
+    async def add(self, server_uuid: UUID, record: ServerRecord, expire_at: float) -> None:
+        async with self._redis.get_client_context() as client:
+            await self._add_script(
+                keys=self._keys,
+                args=[str(server_uuid), record.to_json(), record.online, expire_at, int(record.manifest_hash is not None)],
+                client=client,
+            )
+
+    async def touch(self, online: Mapping[UUID, int], expire_at: float) -> dict[UUID, bool]:
+        if not online:
+            return {}
+        args: list = [expire_at]
+        for server, value in online.items():
+            args.extend((str(server), value))
+        async with self._redis.get_client_context() as client:
+            touched = await self._touch_script(
+                keys=[STORAGE_KEY, ONLINE_KEY, EXPIRES_KEY, RANKING_KEY, VERSION_KEY, CHANGES_KEY], args=args,
+                client=client,
+            )
+        return {server: bool(result) for server, result in zip(online, touched)}
+
+    async def replace(self, server_uuid: UUID, record: ServerRecord) -> bool:
+        async with self._redis.get_client_context() as client:
+            result = await self._replace_script(
+                keys=[STORAGE_KEY, VERSION_KEY, ONLINE_KEY, RANKING_KEY, CHANGES_KEY],
+                args=[str(server_uuid), record.to_json(), int(record.manifest_hash is not None)],
+                client=client,
+            )
+        return bool(result)
+
+    async def remove(self, *servers_uuid: UUID) -> int:
+        if not servers_uuid:
+            return 0
+        async with self._redis.get_client_context() as client:
+            return await self._remove_script(keys=self._keys, args=[str(server) for server in servers_uuid], client=client)
+
+    async def sweep(self, now: float) -> list[UUID]:
+        async with self._redis.get_client_context() as client:
+            expired = await self._sweep_script(keys=[*self._keys, CHANGES_FLOOR_KEY], args=[now, CHANGES_RETAIN], client=client)
+        return [UUID(server) for server in expired]
+
+    async def get(self, server_uuid: UUID) -> Optional[ServerRecord]:
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.hget(STORAGE_KEY, str(server_uuid))
+                pipe.hget(ONLINE_KEY, str(server_uuid))
+                record_json, online = await pipe.execute()
+        if not record_json:
+            return None
+        record = ServerRecord.from_json(record_json)
+        if online is not None:
+            record.online = int(online)
+        return record
+
+    async def get_ranking(self, limit: int) -> list[tuple[UUID, ServerRecord]]:
+        if limit <= 0:
+            return []
+        async with self._redis.get_client_context() as client:
+            result = await self._ranking_script(keys=[RANKING_KEY, STORAGE_KEY], args=[limit], client=client)
+
+        ranking: list[tuple[UUID, ServerRecord]] = []
+        for i in range(0, len(result), 3):
+            server, online, record_json = result[i:i + 3]
+            if not record_json:
+                continue
+            record = ServerRecord.from_json(record_json)
+            record.online = int(float(online))
+            ranking.append((UUID(server), record))
+        return ranking
+
+    async def get_rank(
+        self, server_uuid: UUID, exclude: Collection[UUID] = ()
+    ) -> Optional[tuple[int, ServerRecord]]:
+        # Servers in exclude do not count towards the rank of the ones below them
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zrevrank(RANKING_KEY, str(server_uuid))
+                pipe.hget(STORAGE_KEY, str(server_uuid))
+                pipe.hget(ONLINE_KEY, str(server_uuid))
+                for server in exclude:
+                    pipe.zrevrank(RANKING_KEY, str(server))
+                rank, record_json, online, *excluded = await pipe.execute()
+        if rank is None or not record_json:
+            return None
+        rank -= sum(1 for other in excluded if other is not None and other < rank)
+        record = ServerRecord.from_json(record_json)
+        if online is not None:
+            record.online = int(online)
+        return rank + 1, record
+
+    async def put_manifest(self, digest: str, content: bytes) -> None:
+        async with self._redis.get_client_context() as client:
+            await client.set(MANIFEST_KEY.format(digest=digest), content, ex=MANIFEST_TTL)
+
+    async def get_manifest(self, digest: str) -> Optional[bytes]:
+        async with self._redis.get_client_context() as client:
+            content = await client.get(MANIFEST_KEY.format(digest=digest))
+        return content.encode() if content is not None else None
+
+    async def refresh_manifests(self, digests: Iterable[str]) -> None:
+        # Keeps the manifests of servers that are still online from expiring, the rest age out
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=False) as pipe:
+                for digest in digests:
+                    pipe.expire(MANIFEST_KEY.format(digest=digest), MANIFEST_TTL)
+                await pipe.execute()
+
+    async def acquire_lease(self, name: str, token: str, ttl: float) -> bool:
+        # Taken or renewed by the holder of the token, other workers get False until it expires
+        async with self._redis.get_client_context() as client:
+            result = await self._lease_script(keys=[LEASE_KEY.format(name=name)], args=[token, int(ttl * 1000)], client=client)
+        return bool(result)
+
+    async def claim_channel(self, server_uuid: UUID, token: str) -> None:
+        # A channel older than the TTL is simply never released, the heartbeat expiry removes the server
+        async with self._redis.get_client_context() as client:
+            await client.set(CHANNEL_KEY.format(uuid=server_uuid), token, ex=CHANNEL_TTL)
+
+    async def release_channel(self, server_uuid: UUID, token: str) -> bool:
+        # False once a newer channel, on any worker, has claimed the server
+        async with self._redis.get_client_context() as client:
+            result = await self._release_script(keys=[CHANNEL_KEY.format(uuid=server_uuid)], args=[token], client=client)
+        return bool(result)
+
+    async def put_reachability(self, results: Mapping[UUID, ServerReachability]) -> None:
+        # Replaced as a whole, so servers that are gone drop out with it
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(REACHABILITY_KEY)
+                if results:
+                    pipe.hset(REACHABILITY_KEY, mapping={
+                        str(server): orjson.dumps(list(result)) for server, result in results.items()
+                    })
+                await pipe.execute()
+
+    async def get_reachability(self) -> dict[UUID, ServerReachability]:
+        async with self._redis.get_client_context() as client:
+            results = await client.hgetall(REACHABILITY_KEY)
+        return {UUID(server): ServerReachability(*orjson.loads(value)) for server, value in results.items()}
+
+    async def get_version(self) -> int:
+        async with self._redis.get_client_context() as client:
+            version = await client.get(VERSION_KEY)
+        return int(version or 0)
+
+    async def get_all(self) -> tuple[int, dict[UUID, ServerRecord]]:
+        async with self._redis.get_client_context() as client:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.get(VERSION_KEY)
+                pipe.hgetall(STORAGE_KEY)
+                pipe.hgetall(ONLINE_KEY)
+                version, records, online = await pipe.execute()
+
+        servers: dict[UUID, ServerRecord] = {}
+        for server, record_json in records.items():
+            record = ServerRecord.from_json(record_json)
+            if server in online:
+                record.online = int(online[server])
+            servers[UUID(server)] = record
+        return int(version or 0), servers
+
+    async def get_changes(self, since: int) -> tuple[int, Optional[dict[UUID, Optional[ServerRecord]]]]:
+        # Servers changed after the given version, None for the removed ones. The whole result is
+        # None when the changelog no longer reaches back that far and get_all is needed instead
+        async with self._redis.get_client_context() as client:
+            result = await self._changes_script(
+                keys=[VERSION_KEY, CHANGES_FLOOR_KEY, CHANGES_KEY, STORAGE_KEY, ONLINE_KEY], args=[since],
+                client=client,
+            )
+        version, complete = int(result[0]), bool(result[1])
+        if not complete:
+            return version, None
+
+        changes: dict[UUID, Optional[ServerRecord]] = {}
+        for i in range(2, len(result), 3):
+            server, record_json, online = result[i:i + 3]
+            record = ServerRecord.from_json(record_json) if record_json else None
+            if record is not None and online:
+                record.online = int(online)
+            changes[UUID(server)] = record
+        return version, changes
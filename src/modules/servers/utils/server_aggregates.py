@@ -0,0 +1,86 @@
+from collections.abc import Mapping
+from typing import Optional
+from uuid import UUID
+
+from shared.enum import ServerGamemode
+from ..schema import ServerRecord
+
+__all__ = ["ServerAggregates", "ServerCounter"]
+
+
+class ServerCounter:
+    __slots__ = ("servers", "players")
+
+    def __init__(self) -> None:
+        self.servers = 0
+        self.players = 0
+
+
+class ServerAggregates:
+    # Totals over the listed servers (the ones with a manifest), kept up to date by
+    # ServerManagementTask so reading them never walks the registry
+    def __init__(self) -> None:
+        self.total = ServerCounter()
+        self.gamemodes: dict[ServerGamemode, ServerCounter] = {}
+        self.locales: dict[str, ServerCounter] = {}
+        self.game_versions: dict[str, ServerCounter] = {}
+
+    @classmethod
+    def from_servers(cls, servers: Mapping[UUID, ServerRecord]) -> "ServerAggregates":
+        aggregates = cls()
+        for record in servers.values():
+            aggregates.add(record)
+        return aggregates
+
+    def add(self, record: ServerRecord) -> None:
+        if record.manifest_hash is None:
+            return
+        for counter in self._counters(record, create=True):
+            counter.servers += 1
+            counter.players += record.online
+
+    def discard(self, record: ServerRecord) -> None:
+        if record.manifest_hash is None:
+            return
+        for counter in self._counters(record):
+            counter.servers -= 1
+            counter.players -= record.online
+        self._drop_empty(self.gamemodes, record.gamemode)
+        self._drop_empty(self.locales, record.locale)
+        self._drop_empty(self.game_versions, record.game_version)
+
+    def update_online(self, record: ServerRecord, online: int) -> None:
+        # Called before record.online is changed
+        if record.manifest_hash is None:
+            return
+        for counter in self._counters(record):
+            counter.players += online - record.online
+
+    def rebuild(self, servers: Mapping[UUID, ServerRecord]) -> None:
+        rebuilt = self.from_servers(servers)
+        self.total = rebuilt.total
+        self.gamemodes = rebuilt.gamemodes
+        self.locales = rebuilt.locales
+        self.game_versions = rebuilt.game_versions
+
+    def _counters(self, record: ServerRecord, create: bool = False) -> list[ServerCounter]:
+        counters = [self.total]
+        for groups, key in (
+            (self.gamemodes, record.gamemode),
+            (self.locales, record.locale),
+            (self.game_versions, record.game_version),
+        ):
+            if key is None:
+                continue
+            counter = groups.get(key, None)
+            if counter is None and create:
+                counter = groups[key] = ServerCounter()
+            if counter is not None:
+                counters.append(counter)
+        return counters
+
+    @staticmethod
+    def _drop_empty(groups: dict, key: Optional[object]) -> None:
+        counter = groups.get(key, None)
+        if counter is not None and counter.servers <= 0:
+            del groups[key]
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, NamedTuple
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from core.cache.redis_manager import RedisManager
+from shared.interfaces import BaseTask
+from ..schema import ServerModel
+
+logger = logging.getLogger("app")
+
+__all__ = ["ServerCache", "ServerCacheInvalidationTask", "INVALIDATE_CHANNEL"]
+
+INVALIDATE_CHANNEL = "servers:invalidate"
+
+
+class ServerCacheEntry(NamedTuple):
+    expire_at: float
+    server: ServerModel
+
+
+class ServerCache:
+    # Bounded LRU of parsed server settings, the TTL only limits staleness if an invalidation is missed
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0) -> None:
+        self._entries: OrderedDict[UUID, ServerCacheEntry] = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, server_uuid: UUID) -> Optional[ServerModel]:
+        entry = self._entries.get(server_uuid, None)
+        if entry is None:
+            return None
+        if entry.expire_at < time.monotonic():
+            del self._entries[server_uuid]
+            return None
+        self._entries.move_to_end(server_uuid)
+        return entry.server
+
+    def put(self, server_uuid: UUID, server: ServerModel) -> None:
+        self._entries[server_uuid] = ServerCacheEntry(expire_at=time.monotonic() + self._ttl, server=server)
+        self._entries.move_to_end(server_uuid)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, server_uuid: UUID) -> None:
+        self._entries.pop(server_uuid, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class ServerCacheInvalidationTask(BaseTask):
+    def __init__(self, cache: ServerCache, redis_manager: RedisManager, retry_interval: float = 1.0) -> None:
+        super().__init__()
+        self._cache = cache
+        self._redis_manager = redis_manager
+        self._retry_interval = retry_interval
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except RedisError as e:
+                    logger.error("Server cache invalidation channel failed: %s", e)
+                # Invalidations sent while unsubscribed are lost
+                self._cache.clear()
+                await asyncio.sleep(self._retry_interval)
+        except asyncio.CancelledError:
+            pass
+
+    async def _listen(self) -> None:
+        async with self._redis_manager.get_client_context() as client:
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                self._cache.clear()
+                async for message in pubsub.listen():
+                    try:
+                        self._cache.discard(UUID(message["data"]))
+                    except ValueError:
+                        logger.warning("Invalid server cache invalidation: %r", message["data"])
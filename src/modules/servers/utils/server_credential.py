@@ -0,0 +1,24 @@
+import asyncio
+from ipaddress import IPv4Address
+from typing import Optional
+from uuid import UUID
+
+import bcrypt
+
+from core import database_manager
+from .crud_server import read_server_credential
+
+__all__ = ["authenticate_server"]
+
+
+async def authenticate_server(server_uuid: UUID, secret: str, client_ip: Optional[IPv4Address] = None) -> bool:
+    # The secret is stored as a bcrypt hash, checked off the event loop as it is slow on purpose
+    async with database_manager.get_session_context() as db_session:
+        credential = await read_server_credential(db_session, server_uuid)
+    if credential is None:
+        return False
+    if credential.allowed_ips is not None and client_ip != credential.allowed_ips:
+        return False
+    return await asyncio.to_thread(
+        bcrypt.checkpw, secret.encode("utf-8"), credential.secret_hash.get_secret_value()
+    )
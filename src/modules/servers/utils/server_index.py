@@ -0,0 +1,200 @@
+import base64
+from bisect import bisect_left
+from collections.abc import Iterator, Mapping
+from itertools import islice
+from typing import Optional
+from uuid import UUID
+
+import orjson
+from sortedcontainers import SortedList
+
+from shared.enum import ServerGamemode, ServersSort
+from ..schema import ServerRecord
+
+__all__ = ["ServerIndex"]
+
+
+class ServerIndex:
+    # Secondary indexes over the listed servers (the ones with a manifest): equality sets per attribute,
+    # online buckets and a sorted name list for ordering, online ranges and ranking. Kept up to date
+    # by ServerManagementTask on every mutation.
+    def __init__(self) -> None:
+        self._by_gamemode: dict[ServerGamemode, set[UUID]] = {}
+        self._by_locale: dict[str, set[UUID]] = {}
+        self._by_game_version: dict[str, set[UUID]] = {}
+        # Online counts are small and bounded, a heartbeat only moves the server between two bucket sets.
+        # The UUID order inside a bucket (the tie break of the online sort and of the Redis ranking) is
+        # sorted only when a page or a rank needs it and kept until the bucket changes. Sorted entries
+        # lead with uuid.int, comparing UUID objects goes through Python level methods.
+        self._by_online: dict[int, set[UUID]] = {}
+        self._online_order: dict[int, list[tuple[int, UUID]]] = {}
+        self._online_counts = SortedList()
+        self._by_name = SortedList()
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def add(self, server_uuid: UUID, record: ServerRecord) -> None:
+        if record.manifest_hash is None:
+            return
+        self._by_gamemode.setdefault(record.gamemode, set()).add(server_uuid)
+        if record.locale is not None:
+            self._by_locale.setdefault(record.locale, set()).add(server_uuid)
+        if record.game_version is not None:
+            self._by_game_version.setdefault(record.game_version, set()).add(server_uuid)
+        self._add_online(record.online, server_uuid)
+        self._by_name.add((record.display_name.casefold(), server_uuid.int, server_uuid))
+
+    def discard(self, server_uuid: UUID, record: ServerRecord) -> None:
+        if record.manifest_hash is None:
+            return
+        self._discard_member(self._by_gamemode, record.gamemode, server_uuid)
+        self._discard_member(self._by_locale, record.locale, server_uuid)
+        self._discard_member(self._by_game_version, record.game_version, server_uuid)
+        self._discard_online(record.online, server_uuid)
+        self._by_name.discard((record.display_name.casefold(), server_uuid.int, server_uuid))
+
+    def update_online(self, server_uuid: UUID, record: ServerRecord, online: int) -> None:
+        # Called before record.online is changed
+        if record.manifest_hash is None:
+            return
+        if online != record.online:
+            self._discard_online(record.online, server_uuid)
+            self._add_online(online, server_uuid)
+
+    def rebuild(self, servers: Mapping[UUID, ServerRecord]) -> None:
+        self.clear()
+        servers = {server: record for server, record in servers.items() if record.manifest_hash is not None}
+        for server_uuid, record in servers.items():
+            self._by_gamemode.setdefault(record.gamemode, set()).add(server_uuid)
+            if record.locale is not None:
+                self._by_locale.setdefault(record.locale, set()).add(server_uuid)
+            if record.game_version is not None:
+                self._by_game_version.setdefault(record.game_version, set()).add(server_uuid)
+        for server_uuid, record in servers.items():
+            self._by_online.setdefault(record.online, set()).add(server_uuid)
+        self._online_counts = SortedList(self._by_online)
+        self._by_name = SortedList(
+            (record.display_name.casefold(), server.int, server) for server, record in servers.items()
+        )
+
+    def clear(self) -> None:
+        self._by_gamemode.clear()
+        self._by_locale.clear()
+        self._by_game_version.clear()
+        self._by_online = {}
+        self._online_order = {}
+        self._online_counts = SortedList()
+        self._by_name = SortedList()
+
+    def candidates(
+        self,
+        gamemode: Optional[ServerGamemode] = None,
+        locale: Optional[str] = None,
+        game_version: Optional[str] = None,
+        ) -> Optional[set[UUID]]:
+        # None means no equality filter was given, an empty set means nothing matches
+        sets = []
+        if gamemode is not None:
+            sets.append(self._by_gamemode.get(gamemode, set()))
+        if locale is not None:
+            sets.append(self._by_locale.get(locale, set()))
+        if game_version is not None:
+            sets.append(self._by_game_version.get(game_version, set()))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def iter_ordered(
+        self,
+        sort: ServersSort,
+        after: Optional[tuple] = None,
+        min_online: Optional[int] = None,
+        max_online: Optional[int] = None,
+        ) -> Iterator[UUID]:
+        # Online is walked from the most populated down, name in alphabetical order
+        if sort == ServersSort.online:
+            highest = max_online
+            if after is not None:
+                highest = after[0] if highest is None else min(highest, after[0])
+            for online in self._online_counts.irange(minimum=min_online, maximum=highest, reverse=True):
+                order = self._bucket_order(online)
+                end = bisect_left(order, (after[1].int,)) if after is not None and online == after[0] else len(order)
+                for position in range(end - 1, -1, -1):
+                    yield order[position][1]
+        else:
+            minimum = (after[0], after[1].int + 1) if after is not None else None
+            for _, _, server_uuid in self._by_name.irange(minimum=minimum):
+                yield server_uuid
+
+    def top(self, limit: int) -> list[UUID]:
+        return list(islice(self.iter_ordered(ServersSort.online), limit)) if limit > 0 else []
+
+    def rank(self, server_uuid: UUID, record: ServerRecord) -> Optional[int]:
+        # 1-based position by online, ties broken the same way as the Redis ranking
+        bucket = self._by_online.get(record.online, None)
+        if bucket is None or server_uuid not in bucket:
+            return None
+        higher = sum(
+            len(self._by_online[online])
+            for online in self._online_counts.irange(minimum=record.online, inclusive=(False, True))
+        )
+        return higher + len(bucket) - bisect_left(self._bucket_order(record.online), (server_uuid.int,))
+
+    @staticmethod
+    def sort_key(sort: ServersSort, server_uuid: UUID, record: ServerRecord) -> tuple:
+        if sort == ServersSort.online:
+            return (record.online, server_uuid)
+        return (record.display_name.casefold(), server_uuid)
+
+    @staticmethod
+    def make_cursor(sort: ServersSort, server_uuid: UUID, record: ServerRecord) -> str:
+        key, _ = ServerIndex.sort_key(sort, server_uuid, record)
+        return base64.urlsafe_b64encode(orjson.dumps([sort, key, str(server_uuid)])).decode()
+
+    @staticmethod
+    def parse_cursor(sort: ServersSort, cursor: str) -> tuple:
+        # Raises ValueError on anything that was not produced by make_cursor for the same sort
+        try:
+            cursor_sort, key, server = orjson.loads(base64.urlsafe_b64decode(cursor))
+            server_uuid = UUID(server)
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValueError("Malformed cursor") from e
+        expected = int if sort == ServersSort.online else str
+        if cursor_sort != sort or type(key) is not expected:
+            raise ValueError("Cursor does not match the sort order")
+        return (key, server_uuid)
+
+    @staticmethod
+    def _discard_member(index: dict, key, server_uuid: UUID) -> None:
+        members = index.get(key, None)
+        if members is None:
+            return
+        members.discard(server_uuid)
+        if not members:
+            del index[key]
+
+    def _bucket_order(self, online: int) -> list[tuple[int, UUID]]:
+        order = self._online_order.get(online, None)
+        if order is None:
+            order = self._online_order[online] = sorted((server.int, server) for server in self._by_online[online])
+        return order
+
+    def _add_online(self, online: int, server_uuid: UUID) -> None:
+        bucket = self._by_online.get(online, None)
+        if bucket is None:
+            bucket = self._by_online[online] = set()
+            self._online_counts.add(online)
+        bucket.add(server_uuid)
+        self._online_order.pop(online, None)
+
+    def _discard_online(self, online: int, server_uuid: UUID) -> None:
+        bucket = self._by_online.get(online, None)
+        if bucket is None or server_uuid not in bucket:
+            return
+        bucket.discard(server_uuid)
+        self._online_order.pop(online, None)
+        if not bucket:
+            del self._by_online[online]
+            self._online_counts.remove(online)
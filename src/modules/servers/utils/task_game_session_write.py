@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from core.database.alchemy_manager import SqlAlchemyManager
+from shared.interfaces import BaseTask
+from ..schema import GameSessionRecord
+from .crud_server import create_game_sessions
+from .game_session_store import GameSessionStore
+
+logger = logging.getLogger("app")
+
+__all__ = ["GameSessionWriteTask"]
+
+
+class GameSessionWriteTask(BaseTask):
+    # Write-behind for game sessions: every worker drains the shared pending list, LPOP hands
+    # each session to exactly one of them
+    def __init__(
+        self,
+        store: GameSessionStore,
+        database_manager: SqlAlchemyManager,
+        interval: float = 1.0,
+        batch_size: int = 1000,
+        ) -> None:
+        super().__init__()
+        self._store = store
+        self._database_manager = database_manager
+        self._interval = interval
+        self._batch_size = batch_size
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    await self._flush()
+                except Exception as e:
+                    # The task must outlive any single failure, the sessions stay in the pending list
+                    logger.error("Failed to flush game sessions: %s", e, exc_info=True)
+                await asyncio.sleep(self._interval)
+        except asyncio.CancelledError:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        while True:
+            try:
+                records = await self._store.pop_pending(self._batch_size)
+            except RedisError as e:
+                logger.error("Failed to read pending game sessions: %s", e)
+                return
+            if not records:
+                return
+            # Popped sessions go back to the list on any failure. Writing one twice is harmless,
+            # the insert skips session ids that already exist
+            try:
+                async with self._database_manager.get_session_context() as session:
+                    await create_game_sessions(session=session, records=records)
+            except IntegrityError:
+                # A single bad row must not block the queue forever
+                await self._write_one_by_one(records)
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    logger.error("Failed to write %d game sessions: %s", len(records), e)
+                await self._requeue(records)
+                if not isinstance(e, (SQLAlchemyError, OSError)):
+                    raise
+                return
+            if len(records) < self._batch_size:
+                return
+
+    async def _write_one_by_one(self, records: list[GameSessionRecord]) -> None:
+        for position, record in enumerate(records):
+            try:
+                async with self._database_manager.get_session_context() as session:
+                    await create_game_sessions(session=session, records=[record])
+            except IntegrityError as e:
+                logger.error("Dropped game session %s: %s", record.session_id, e)
+            except BaseException:
+                await self._requeue(records[position:])
+                raise
+
+    async def _requeue(self, records: list[GameSessionRecord]) -> None:
+        try:
+            await self._store.requeue(records)
+        except RedisError as e:
+            logger.error("Failed to requeue %d game sessions: %s", len(records), e)
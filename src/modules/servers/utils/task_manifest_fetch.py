@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from ipaddress import IPv4Address
+from typing import NamedTuple
+from uuid import UUID
+
+import httpx
+from pydantic import ValidationError
+
+from shared.interfaces import BaseTask
+from .manifest_fetcher import ManifestFetcher
+from .task_server_manager import ServerManagementTask
+
+logger = logging.getLogger("app")
+
+__all__ = ["ManifestFetchTask"]
+
+
+class ManifestJob(NamedTuple):
+    server_uuid: UUID
+    host: IPv4Address
+    port: int
+    attempt: int = 0
+
+
+class ManifestFetchTask(BaseTask):
+    def __init__(
+        self,
+        fetcher: ManifestFetcher,
+        server_manager: ServerManagementTask,
+        workers: int = 8,
+        retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        ) -> None:
+        super().__init__()
+        self._fetcher = fetcher
+        self._server_manager = server_manager
+        self._workers = workers
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        # Jobs wait in a queue per host and a host is handed to one worker at a time, so a host with
+        # many servers or a slow one never ties up more than one worker on the per-host HTTP limit
+        self._ready: asyncio.Queue[IPv4Address] = asyncio.Queue()
+        self._host_jobs: dict[IPv4Address, deque[ManifestJob]] = {}
+        self._scheduled: set[UUID] = set()
+
+    def schedule(self, server_uuid: UUID, host: IPv4Address, port: int) -> None:
+        if server_uuid in self._scheduled:
+            return
+        self._scheduled.add(server_uuid)
+        self._enqueue(ManifestJob(server_uuid=server_uuid, host=host, port=port))
+
+    def _enqueue(self, job: ManifestJob) -> None:
+        jobs = self._host_jobs.get(job.host, None)
+        if jobs is None:
+            jobs = self._host_jobs[job.host] = deque()
+            self._ready.put_nowait(job.host)
+        jobs.append(job)
+
+    async def _run(self) -> None:
+        workers = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            host = await self._ready.get()
+            jobs = self._host_jobs[host]
+            job = jobs.popleft()
+            try:
+                await self._process(job)
+            except Exception as e:
+                self._scheduled.discard(job.server_uuid)
+                logger.error("Manifest job for server %s failed: %s", job.server_uuid, e, exc_info=True)
+            finally:
+                # The host stays claimed while its job runs, then goes to the back of the line
+                if jobs:
+                    self._ready.put_nowait(host)
+                else:
+                    del self._host_jobs[host]
+
+    async def _process(self, job: ManifestJob) -> None:
+        if await self._server_manager.get_server(job.server_uuid) is None:
+            # Server stopped sending heartbeats while waiting in the queue
+            self._scheduled.discard(job.server_uuid)
+            return
+        try:
+            manifest = await self._fetcher.fetch(server_uuid=job.server_uuid, host=job.host, port=job.port)
+        except (httpx.HTTPError, ValidationError) as e:
+            if job.attempt + 1 >= self._retries:
+                self._scheduled.discard(job.server_uuid)
+                # Unregister, the next heartbeat registers the server again and restarts the fetch
+                await self._server_manager.remove_server(job.server_uuid)
+                logger.warning("Manifest of server %s is unavailable: %s", job.server_uuid, e)
+                return
+            delay = min(self._max_backoff, self._backoff * 2 ** job.attempt) * random.uniform(0.5, 1.0)
+            asyncio.get_running_loop().call_later(
+                delay, self._enqueue, job._replace(attempt=job.attempt + 1)
+            )
+            return
+        self._scheduled.discard(job.server_uuid)
+        await self._server_manager.set_manifest(server_uuid=job.server_uuid, manifest=manifest)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+import secrets
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.database.alchemy_manager import SqlAlchemyManager
+from shared.enum import HistoryResolution
+from shared.interfaces import BaseTask
+from .crud_server import upsert_server_history
+from .online_history import OnlineHistory
+from .redis_registry import RedisServerRegistry
+from .task_server_manager import ServerManagementTask
+
+logger = logging.getLogger("app")
+
+__all__ = ["OnlineHistoryTask"]
+
+# Minute buckets stay in memory only, persisting them would mean a row per server every minute
+PERSISTED_RESOLUTIONS = (HistoryResolution.hour, HistoryResolution.day)
+FLUSH_BATCH = 5000
+
+
+class OnlineHistoryTask(BaseTask):
+    # Every worker samples into its own buckets to serve reads. With a shared registry only the
+    # holder of the history lease writes them to the database, the same rows are not upserted per worker.
+    def __init__(
+        self,
+        server_manager: ServerManagementTask,
+        history: OnlineHistory,
+        database_manager: Optional[SqlAlchemyManager] = None,
+        registry: Optional[RedisServerRegistry] = None,
+        sample_interval: float = 15.0,
+        idle_ttl: float = 86400.0,
+        flush_interval: float = 300.0,
+        ) -> None:
+        super().__init__()
+        self._server_manager = server_manager
+        self._history = history
+        # Without a database manager the history lives in memory only
+        self._database_manager = database_manager
+        self._registry = registry
+        self._lease_token = secrets.token_hex(8)
+        self._sample_interval = sample_interval
+        self._idle_ttl = idle_ttl
+        self._flush_interval = flush_interval
+        self._flushed_at = time.monotonic()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    await self._sample(time.time())
+                except RedisError as e:
+                    logger.error("Failed to sample server online history: %s", e)
+                if self._database_manager is None:
+                    self._history.evict_idle(time.time() - self._idle_ttl)
+                elif time.monotonic() - self._flushed_at >= self._flush_interval:
+                    await self._flush()
+                await asyncio.sleep(self._sample_interval)
+        except asyncio.CancelledError:
+            if self._database_manager is not None:
+                await self._flush()
+
+    async def _sample(self, now: float) -> None:
+        servers = await self._server_manager.get_online_servers()
+        for server_uuid, record in servers.items():
+            self._history.add(server_uuid, now, record.online)
+
+    async def _flush(self) -> None:
+        if self._database_manager is None:
+            return
+        self._flushed_at = time.monotonic()
+        if not await self._is_writer():
+            self._history.evict_idle(time.time() - self._idle_ttl)
+            return
+        rows, marks = self._history.collect_unflushed(PERSISTED_RESOLUTIONS)
+        try:
+            if rows:
+                async with self._database_manager.get_session_context() as session:
+                    for start in range(0, len(rows), FLUSH_BATCH):
+                        await upsert_server_history(session, rows[start:start + FLUSH_BATCH])
+        except (SQLAlchemyError, OSError) as e:
+            logger.error("Failed to flush server online history: %s", e)
+            return
+        self._history.mark_flushed(marks)
+        # Only histories that are fully stored can be dropped
+        self._history.evict_idle(time.time() - self._idle_ttl)
+
+    async def _is_writer(self) -> bool:
+        if not self._registry:
+            return True
+        try:
+            return await self._registry.acquire_lease(
+                "history", token=self._lease_token, ttl=self._flush_interval * 2
+            )
+        except RedisError as e:
+            logger.error("Failed to take the server history lease: %s", e)
+            return False
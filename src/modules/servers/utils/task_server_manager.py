@@ -1,56 +1,502 @@
 import asyncio
 import logging
-from typing import Optional
+from typing import Optional, NamedTuple
+from collections.abc import Iterable, Mapping
+from types import MappingProxyType
 import time
+import secrets
 from uuid import UUID
 
+from redis.exceptions import RedisError
+
 from shared.interfaces import BaseTask
-from ..schema import ServerStorage
+from shared.utils import make_etag
+from shared.enum import ServerGamemode, ServersSort
+from ..schema import ServerRecord, ServerReachability, ServerInfo, ServersListResponse, ServerModsManifest, ServersStats, ServersGroupStats
+from .redis_registry import RedisServerRegistry, MANIFEST_TTL
+from .expiry_index import ExpiryIndex
+from .manifest_store import ManifestStore, ManifestEntry
+from .server_index import ServerIndex
+from .server_aggregates import ServerAggregates
 
 logger = logging.getLogger("app")
 
+class ServersListSnapshot(NamedTuple):
+    version: int
+    etag: str
+    content: bytes
+
 class ServerManagementTask(BaseTask):
-    def __init__(self, expires: float = 7.5) -> None:
+    def __init__(
+        self,
+        expires: float = 7.5,
+        registry: Optional[RedisServerRegistry] = None,
+        local_cache: bool = True,
+        interval: float = 2.0,
+        snapshot_interval: float = 1.0,
+        hide_unreachable: bool = False,
+        ) -> None:
         super().__init__()
-        self._servers_expires: dict[UUID, float] = {}
-        self._servers_online: dict[UUID, ServerStorage] = {}
+        self._servers_expires: ExpiryIndex[UUID] = ExpiryIndex()
+        # Copy-on-write: membership changes publish a new read-only mapping, readers just take the
+        # current reference. Online counters are updated in place on the stored record.
+        self._servers: dict[UUID, ServerRecord] = {}
+        self._servers_online: Mapping[UUID, ServerRecord] = MappingProxyType(self._servers)
+        # Servers added during the current loop iteration, published together with one copy
+        self._servers_pending: dict[UUID, ServerRecord] = {}
+        self._publish_scheduled = False
         self._expire = expires
+        self._interval = interval
+        # With a shared registry the local dicts are only an L1 copy of Redis
+        self._registry = registry
+        self._local_cache = local_cache or registry is None
+        self._registry_version: Optional[int] = None
+        # Bumped on every visible change, the list snapshot is rebuilt lazily from it
+        self._version = 0
+        self._snapshot_interval = snapshot_interval
+        self._snapshot: Optional[ServersListSnapshot] = None
+        self._snapshot_built_at = 0.0
+        self._manifests = ManifestStore()
+        self._manifests_dirty = False
+        self._manifests_refresh_at = 0.0
+        self._index = ServerIndex()
+        self._aggregates = ServerAggregates()
+        # Filled by ServerProbeTask, unreachable servers are flagged in the list or left out of it
+        self._reachability: Mapping[UUID, ServerReachability] = {}
+        self._unreachable: frozenset[UUID] = frozenset()
+        self._hide_unreachable = hide_unreachable
+        # Latest heartbeat channel per server, only that one may remove the server when it closes
+        self._channels: dict[UUID, str] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def has_changed(self, version: Optional[int]) -> bool:
+        # Without the L1 copy changes made by other workers do not bump the local version
+        return not self._local_cache or version != self._version
+
+    async def add_server(self, server_uuid: UUID, record: ServerRecord) -> None:
+        expire_at = time.time() + self._expire
+        if self._registry:
+            await self._registry.add(server_uuid=server_uuid, record=record, expire_at=expire_at)
+        self._servers_expires.push(server_uuid, expire_at)
+        self._publish_servers(added={server_uuid: record})
+
+    async def update_server(self, server_uuid: UUID, online: int) -> bool:
+        updated = await self.update_servers({server_uuid: online})
+        return updated[server_uuid]
 
-    async def add_server(self, server_uuid: UUID, storage: ServerStorage) -> None:
-        async with self._lock:
-            self._servers_expires[server_uuid] = time.time() + self._expire
-            self._servers_online[server_uuid] = storage
-    
-    async def update_server(self, server_uuid: UUID, online: int) -> None:
-        async with self._lock:
-            self._servers_expires[server_uuid] = time.time() + self._expire
-            self._servers_online[server_uuid].online = online
+    async def update_servers(self, online: Mapping[UUID, int]) -> dict[UUID, bool]:
+        # One registry round trip for the whole batch, the local pass below never yields
+        expire_at = time.time() + self._expire
+        if self._registry:
+            updated = await self._registry.touch(online=online, expire_at=expire_at)
+            self._remove_servers(*(server for server, known in updated.items() if not known))
+        else:
+            updated = {server: self._lookup(server) is not None for server in online}
 
+        changed = False
+        for server, value in online.items():
+            record = self._lookup(server)
+            if record is None:
+                # Unknown, or registered through another worker and the L1 copy catches up on the next sync
+                continue
+            self._servers_expires.push(server, expire_at)
+            if record.online != value:
+                self._set_online(server, record, value)
+                changed = True
+        if changed:
+            self._version += 1
+        return updated
+
+    async def set_manifest(self, server_uuid: UUID, manifest: ServerModsManifest) -> bool:
+        record = await self.get_server(server_uuid)
+        if record is None:
+            return False
+        entry = self._manifests.put(manifest)
+        if self._registry:
+            await self._registry.put_manifest(digest=entry.digest, content=entry.content)
+            updated = record.copy()
+            updated.manifest_hash = entry.digest
+            if not await self._registry.replace(server_uuid=server_uuid, record=updated):
+                return False
+        listed = record.manifest_hash is not None
+        record.manifest_hash = entry.digest
+        if not listed and self._lookup(server_uuid) is record:
+            # The server shows up in the list only now
+            self._index_add(server_uuid, record)
+        self._version += 1
+        return True
+
+    def set_reachability(self, results: Mapping[UUID, ServerReachability]) -> None:
+        self._reachability = results
+        unreachable = frozenset(server for server, result in results.items() if not result.reachable)
+        if unreachable == self._unreachable:
+            return
+        if not self._hide_unreachable:
+            self._unreachable = unreachable
+            self._version += 1
+            return
+        # Hidden servers leave the index and the aggregates while they are still visible, and come
+        # back once they are not hidden any more
+        for server in unreachable - self._unreachable:
+            record = self._lookup(server)
+            if record is not None:
+                self._index_discard(server, record)
+        reachable_again = self._unreachable - unreachable
+        self._unreachable = unreachable
+        for server in reachable_again:
+            record = self._lookup(server)
+            if record is not None:
+                self._index_add(server, record)
+        self._version += 1
+
+    def get_reachability(self, server_uuid: UUID) -> Optional[ServerReachability]:
+        return self._reachability.get(server_uuid, None)
+
+    async def get_manifest(self, digest: str) -> Optional[ManifestEntry]:
+        entry = self._manifests.get(digest)
+        if entry is None and self._registry:
+            # Fetched by another worker
+            content = await self._registry.get_manifest(digest)
+            if content is not None:
+                entry = self._manifests.put_content(digest, content)
+        return entry
 
     async def remove_server(self, server_uuid: UUID) -> None:
-        async with self._lock:
-            self._remove_server_unsafe(server_uuid)
+        if self._registry:
+            await self._registry.remove(server_uuid)
+        self._remove_servers(server_uuid)
+
+    async def open_channel(self, server_uuid: UUID) -> str:
+        token = secrets.token_hex(8)
+        self._channels[server_uuid] = token
+        if self._registry:
+            await self._registry.claim_channel(server_uuid, token)
+        return token
+
+    async def close_channel(self, server_uuid: UUID, token: str) -> bool:
+        # False when the server has reconnected since, the newer channel owns it now
+        latest = self._channels.get(server_uuid, None) == token
+        if latest:
+            del self._channels[server_uuid]
+        if self._registry:
+            return await self._registry.release_channel(server_uuid, token)
+        return latest
+
+    async def get_online_servers(self) -> Mapping[UUID, ServerRecord]:
+        if not self._local_cache and self._registry:
+            _, servers = await self._registry.get_all()
+            return servers
+        self._flush_pending()
+        return self._servers_online
+
+    async def get_server(self, server_uuid: UUID) -> Optional[ServerRecord]:
+        if self._local_cache:
+            record = self._lookup(server_uuid)
+            if record or not self._registry:
+                return record
+        if self._registry:
+            record = await self._registry.get(server_uuid)
+            if record and self._local_cache:
+                self._publish_servers(added={server_uuid: record})
+            return record
+        return None
+
+    async def get_servers_snapshot(self) -> ServersListSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._snapshot_built_at < self._snapshot_interval:
+            return snapshot
+        if snapshot is not None and self._local_cache and snapshot.version == self._version:
+            return snapshot
+
+        version = self._version
+        servers = await self.get_online_servers()
+        stats = self._make_stats(self._aggregates if self._local_cache else self._listed_aggregates(servers))
+        servers_info = {
+            server_uuid: ServerInfo(
+                name=record.display_name,
+                online=record.online,
+                maxPlayers=record.max_players,
+            )
+            for server_uuid, record in servers.items()
+            if self.is_listed(server_uuid, record)
+        }
+        content = ServersListResponse(
+            online_servers=stats.online_servers,
+            online_players=stats.online_players,
+            servers=servers_info,
+            stats=stats,
+            unreachable=self.flag_unreachable(servers_info),
+        ).model_dump_json(by_alias=True).encode()
+
+        self._snapshot = ServersListSnapshot(version=version, etag=make_etag(content), content=content)
+        self._snapshot_built_at = now
+        return self._snapshot
+
+    async def get_stats(self) -> ServersStats:
+        if self._local_cache:
+            return self._make_stats(self._aggregates)
+        return self._make_stats(self._listed_aggregates(await self.get_online_servers()))
+
+    async def find_servers(
+        self,
+        gamemode: Optional[ServerGamemode] = None,
+        locale: Optional[str] = None,
+        game_version: Optional[str] = None,
+        min_online: Optional[int] = None,
+        max_online: Optional[int] = None,
+        not_full: bool = False,
+        sort: ServersSort = ServersSort.online,
+        after: Optional[tuple] = None,
+        limit: int = 100,
+        ) -> list[tuple[UUID, ServerRecord]]:
+        servers = await self.get_online_servers()
+        if self._local_cache:
+            candidates = self._index.candidates(gamemode=gamemode, locale=locale, game_version=game_version)
+        else:
+            # Read through to Redis, there is no local index to use
+            candidates = {
+                server for server, record in servers.items()
+                if (gamemode is None or record.gamemode == gamemode)
+                and (locale is None or record.locale == locale)
+                and (game_version is None or record.game_version == game_version)
+            }
+
+        if self._local_cache and (candidates is None or len(candidates) * 8 > len(servers)):
+            ordered = self._index.iter_ordered(sort, after=after, min_online=min_online, max_online=max_online)
+        else:
+            # A selective filter, sorting the few candidates beats walking the ordered index
+            descending = sort == ServersSort.online
+            keyed = sorted(
+                ((ServerIndex.sort_key(sort, server, servers[server]), server) for server in candidates if server in servers),
+                reverse=descending,
+            )
+            ordered = (
+                server for key, server in keyed
+                if after is None or (key < after if descending else key > after)
+            )
+
+        page: list[tuple[UUID, ServerRecord]] = []
+        for server in ordered:
+            if candidates is not None and server not in candidates:
+                continue
+            record = servers.get(server, None)
+            if record is None or not self.is_listed(server, record):
+                continue
+            if min_online is not None and record.online < min_online:
+                continue
+            if max_online is not None and record.online > max_online:
+                continue
+            if not_full and record.online >= record.max_players:
+                continue
+            page.append((server, record))
+            if len(page) >= limit:
+                break
+        return page
 
-    async def get_online_servers(self) -> dict[UUID, ServerStorage]:
-        async with self._lock:
-            return self._servers_online.copy()
+    async def get_ranking(self, limit: int) -> list[tuple[UUID, ServerRecord]]:
+        if not self._local_cache and self._registry:
+            # The shared ranking still holds the hidden servers
+            hidden = self._hidden()
+            ranking = await self._registry.get_ranking(limit + len(hidden))
+            return [(server, record) for server, record in ranking if server not in hidden][:limit]
+        self._flush_pending()
+        return [(server, self._servers_online[server]) for server in self._index.top(limit)]
 
-    async def get_server(self, server_uuid: UUID) -> Optional[ServerStorage]:
-        async with self._lock:
-            return self._servers_online.get(server_uuid, None)
+    async def get_rank(self, server_uuid: UUID) -> Optional[tuple[int, ServerRecord]]:
+        # None for unknown servers and for the ones not listed yet
+        if not self._local_cache and self._registry:
+            hidden = self._hidden()
+            if server_uuid in hidden:
+                return None
+            return await self._registry.get_rank(server_uuid, exclude=hidden)
+        record = await self.get_server(server_uuid)
+        if record is None:
+            return None
+        rank = self._index.rank(server_uuid, record)
+        return (rank, record) if rank is not None else None
+
+    def is_listed(self, server_uuid: UUID, record: ServerRecord) -> bool:
+        if record.manifest_hash is None:
+            return False
+        return server_uuid not in self._hidden()
+
+    def flag_unreachable(self, servers: Iterable[UUID]) -> Optional[list[UUID]]:
+        # Listed servers that failed the reachability probe, None when they are left out of the list anyway
+        if self._hide_unreachable:
+            return None
+        return [server for server in servers if server in self._unreachable]
 
     async def _run(self) -> None:
         try:
             while True:
-                async with self._lock:
-                    now = time.time()
-                    for server, expire_at in list(self._servers_expires.items()):
-                        if expire_at < now:
-                            self._remove_server_unsafe(server)
-                await asyncio.sleep(2.0)
+                try:
+                    if self._registry:
+                        await self._sync_registry()
+                        await self._refresh_manifests()
+                    else:
+                        self._sweep_expired(time.time())
+                    if self._manifests_dirty:
+                        self._manifests_dirty = False
+                        self._flush_pending()
+                        self._manifests.retain(record.manifest_hash for record in self._servers_online.values())
+                except RedisError as e:
+                    logger.error("Failed to synchronize server registry: %s", e)
+                await asyncio.sleep(self._interval)
         except asyncio.CancelledError:
             pass
 
-    def _remove_server_unsafe(self, server: UUID) -> None:
-        self._servers_expires.pop(server, None)
-        self._servers_online.pop(server, None)
\ No newline at end of file
+    async def _sync_registry(self) -> None:
+        if not self._registry:
+            return
+        await self._registry.sweep(time.time())
+        if not self._local_cache:
+            return
+
+        if self._registry_version is not None:
+            # Only the servers changed since the last sync, nothing at all when the version is the same
+            version, changes = await self._registry.get_changes(self._registry_version)
+            if changes is not None:
+                self._apply_changes(changes)
+                self._registry_version = version
+                return
+
+        # First sync, or this worker fell behind the trimmed changelog
+        version, servers = await self._registry.get_all()
+        self._servers_expires.clear()
+        hidden = self._hidden()
+        listed = {server: record for server, record in servers.items() if server not in hidden} if hidden else servers
+        self._index.rebuild(listed)
+        self._aggregates.rebuild(listed)
+        self._swap_servers(servers)
+        self._manifests_dirty = True
+        self._registry_version = version
+
+    def _apply_changes(self, changes: Mapping[UUID, Optional[ServerRecord]]) -> None:
+        self._remove_servers(*(server for server, record in changes.items() if record is None))
+        added: dict[UUID, ServerRecord] = {}
+        for server, record in changes.items():
+            if record is None:
+                continue
+            local = self._lookup(server)
+            if local is not None and self._same_record(local, record):
+                # Only the online counter changed, or the change was made by this worker
+                if local.online != record.online:
+                    self._set_online(server, local, record.online)
+                    self._version += 1
+            else:
+                added[server] = record
+        if added:
+            self._publish_servers(added)
+            self._manifests_dirty = True
+
+    @staticmethod
+    def _same_record(record: ServerRecord, other: ServerRecord) -> bool:
+        return all(getattr(record, name) == getattr(other, name) for name in ServerRecord.__slots__ if name != "online")
+
+    async def _refresh_manifests(self) -> None:
+        # The shared manifest copies expire, a long-running server must not lose its manifest
+        # for the workers that do not hold it in memory
+        now = time.monotonic()
+        if not self._registry or now < self._manifests_refresh_at:
+            return
+        servers = await self.get_online_servers()
+        await self._registry.refresh_manifests({
+            record.manifest_hash for record in servers.values() if record.manifest_hash is not None
+        })
+        self._manifests_refresh_at = now + MANIFEST_TTL / 4
+
+    def _listed_aggregates(self, servers: Mapping[UUID, ServerRecord]) -> ServerAggregates:
+        hidden = self._hidden()
+        return ServerAggregates.from_servers(
+            {server: record for server, record in servers.items() if server not in hidden} if hidden else servers
+        )
+
+    @staticmethod
+    def _make_stats(aggregates: ServerAggregates) -> ServersStats:
+        def groups(counters: Mapping) -> dict:
+            return {
+                key: ServersGroupStats(servers=counter.servers, players=counter.players)
+                for key, counter in counters.items()
+            }
+
+        return ServersStats(
+            online_servers=aggregates.total.servers,
+            online_players=aggregates.total.players,
+            gamemodes=groups(aggregates.gamemodes),
+            locales=groups(aggregates.locales),
+            game_versions=groups(aggregates.game_versions),
+        )
+
+    def _set_online(self, server_uuid: UUID, record: ServerRecord, online: int) -> None:
+        # Every in-place online change has to go through the index and the aggregates
+        if server_uuid not in self._hidden():
+            self._index.update_online(server_uuid, record, online)
+            self._aggregates.update_online(record, online)
+        record.online = online
+
+    def _hidden(self) -> frozenset[UUID]:
+        return self._unreachable if self._hide_unreachable else frozenset()
+
+    def _index_add(self, server_uuid: UUID, record: ServerRecord) -> None:
+        # The index and the aggregates only hold what the list shows, hidden servers stay out
+        if server_uuid not in self._hidden():
+            self._index.add(server_uuid, record)
+            self._aggregates.add(record)
+
+    def _index_discard(self, server_uuid: UUID, record: ServerRecord) -> None:
+        if server_uuid not in self._hidden():
+            self._index.discard(server_uuid, record)
+            self._aggregates.discard(record)
+
+    def _sweep_expired(self, now: float) -> int:
+        return self._remove_servers(*self._servers_expires.pop_expired(now))
+
+    def _lookup(self, server_uuid: UUID) -> Optional[ServerRecord]:
+        # Single lookups see pending servers without forcing a publish
+        record = self._servers_pending.get(server_uuid, None)
+        return record if record is not None else self._servers_online.get(server_uuid, None)
+
+    def _swap_servers(self, servers: dict[UUID, ServerRecord]) -> None:
+        # The published dict is never mutated again, only replaced
+        self._servers_pending.clear()
+        self._servers = servers
+        self._servers_online = MappingProxyType(servers)
+        self._version += 1
+
+    def _publish_servers(self, added: Mapping[UUID, ServerRecord]) -> None:
+        # Copying the mapping per add would make a registration storm quadratic, so adds are
+        # collected and published once at the end of the loop iteration, or earlier when a
+        # reader needs the whole mapping
+        for server, record in added.items():
+            previous = self._lookup(server)
+            if previous is not None:
+                self._index_discard(server, previous)
+            self._index_add(server, record)
+            self._servers_pending[server] = record
+        self._version += 1
+        if not self._publish_scheduled:
+            self._publish_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_pending)
+
+    def _flush_pending(self) -> None:
+        self._publish_scheduled = False
+        if self._servers_pending:
+            self._swap_servers(self._servers | self._servers_pending)
+
+    def _remove_servers(self, *servers_uuid: UUID) -> int:
+        self._flush_pending()
+        for server in servers_uuid:
+            self._servers_expires.discard(server)
+        removed = [server for server in servers_uuid if server in self._servers]
+        if removed:
+            servers = self._servers.copy()
+            for server in removed:
+                record = servers.pop(server)
+                self._index_discard(server, record)
+            self._swap_servers(servers)
+            self._manifests_dirty = True
+        return len(removed)
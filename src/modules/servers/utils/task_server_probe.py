@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+import time
+import secrets
+from typing import Optional
+from uuid import UUID
+
+import httpx
+from redis.exceptions import RedisError
+
+from core.http.httpx_manager import HttpxManager
+from shared.interfaces import BaseTask
+from ..schema import ServerRecord, ServerReachability
+from .redis_registry import RedisServerRegistry
+from .task_server_manager import ServerManagementTask
+
+logger = logging.getLogger("app")
+
+__all__ = ["ServerProbeTask"]
+
+
+class ServerProbeTask(BaseTask):
+    # Checks from the outside that every registered server answers on its manifest port. With a shared
+    # registry one worker holds the probe lease and publishes the results, the others only read them.
+    def __init__(
+        self,
+        server_manager: ServerManagementTask,
+        http_manager: HttpxManager,
+        registry: Optional[RedisServerRegistry] = None,
+        interval: float = 60.0,
+        concurrency: int = 16,
+        timeout: float = 3.0,
+        failures: int = 2,
+        ) -> None:
+        super().__init__()
+        self._server_manager = server_manager
+        self._http = http_manager
+        self._registry = registry
+        self._interval = interval
+        self._concurrency = concurrency
+        self._timeout = timeout
+        # Consecutive failed probes before a server counts as unreachable
+        self._failures = failures
+        self._failed: dict[UUID, int] = {}
+        self._latency: dict[UUID, float] = {}
+        self._lease_token = secrets.token_hex(8)
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    await self._cycle()
+                except RedisError as e:
+                    logger.error("Failed to share server reachability: %s", e)
+                await asyncio.sleep(max(0.0, self._interval - (time.monotonic() - started)))
+        except asyncio.CancelledError:
+            pass
+
+    async def _cycle(self) -> None:
+        if self._registry and not await self._registry.acquire_lease(
+            "probe", token=self._lease_token, ttl=self._interval * 2
+            ):
+            self._server_manager.set_reachability(await self._registry.get_reachability())
+            return
+        results = await self._probe_all()
+        if self._registry:
+            await self._registry.put_reachability(results)
+        self._server_manager.set_reachability(results)
+
+    async def _probe_all(self) -> dict[UUID, ServerReachability]:
+        servers = list((await self._server_manager.get_online_servers()).items())
+        # Random order and even spacing over most of the interval, so probes never arrive in bursts
+        random.shuffle(servers)
+        spacing = self._interval * 0.8 / len(servers) if servers else 0.0
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def probe(server_uuid: UUID, record: ServerRecord, delay: float) -> tuple[UUID, ServerReachability]:
+            await asyncio.sleep(delay)
+            async with semaphore:
+                latency = await self._probe(record)
+            checked_at = time.time()
+            if latency is not None:
+                self._failed.pop(server_uuid, None)
+                self._latency[server_uuid] = latency
+                return server_uuid, ServerReachability(True, latency, checked_at)
+            failed = self._failed[server_uuid] = self._failed.get(server_uuid, 0) + 1
+            return server_uuid, ServerReachability(failed < self._failures, self._latency.get(server_uuid, None), checked_at)
+
+        results = dict(await asyncio.gather(*(
+            probe(server_uuid, record, position * spacing) for position, (server_uuid, record) in enumerate(servers)
+        )))
+        # Forget servers that are gone
+        self._failed = {server: count for server, count in self._failed.items() if server in results}
+        self._latency = {server: latency for server, latency in self._latency.items() if server in results}
+        return results
+
+    async def _probe(self, record: ServerRecord) -> Optional[float]:
+        # Any HTTP answer proves the port is reachable, only transport errors count as failures.
+        # record.port is the UDP game port, the HTTP server listens on the next one
+        try:
+            response, elapsed = await self._http.get_timed(
+                f"http://{record.address}:{record.port + 1}/manifest.json", timeout=self._timeout
+            )
+            await response.aclose()
+        except httpx.TransportError:
+            return None
+        return elapsed * 1000
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from typing import Optional, NamedTuple
+from uuid import UUID
+
+import orjson
+from redis.exceptions import RedisError
+
+from shared.interfaces import BaseTask
+from .task_server_manager import ServerManagementTask
+
+logger = logging.getLogger("app")
+
+__all__ = ["ServersFeedTask", "ServersFeedSubscriber"]
+
+
+class ServerState(NamedTuple):
+    name: str
+    online: int
+    max_players: int
+    reachable: bool = True
+
+
+class ServersFeedSubscriber:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: bytes) -> bool:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up, drop the backlog and tell the stream to end
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+        return True
+
+
+class ServersFeedTask(BaseTask):
+    # Diffs the visible server list once per tick and fans the same encoded event out to every subscriber
+    def __init__(
+        self,
+        server_manager: ServerManagementTask,
+        interval: float = 1.0,
+        queue_size: int = 32,
+        ) -> None:
+        super().__init__()
+        self._server_manager = server_manager
+        self._interval = interval
+        self._queue_size = queue_size
+        self._subscribers: set[ServersFeedSubscriber] = set()
+        self._state: Optional[dict[UUID, ServerState]] = None
+        self._state_version: Optional[int] = None
+        self._snapshot_event: Optional[bytes] = None
+
+    async def subscribe(self) -> tuple[bytes, ServersFeedSubscriber]:
+        if self._state is None:
+            self._state_version = self._server_manager.version
+            self._state = await self._collect()
+            self._snapshot_event = None
+        if self._snapshot_event is None:
+            self._snapshot_event = self._encode_snapshot(self._state)
+        subscriber = ServersFeedSubscriber(self._queue_size)
+        self._subscribers.add(subscriber)
+        return self._snapshot_event, subscriber
+
+    def unsubscribe(self, subscriber: ServersFeedSubscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    await self._tick()
+                except RedisError as e:
+                    logger.error("Failed to build servers feed delta: %s", e)
+                await asyncio.sleep(self._interval)
+        except asyncio.CancelledError:
+            pass
+
+    async def _tick(self) -> None:
+        if not self._subscribers:
+            # Nobody listens, the state is collected again for the next subscriber
+            self._state = None
+            return
+        if self._state is None or not self._server_manager.has_changed(self._state_version):
+            return
+
+        self._state_version = self._server_manager.version
+        state = await self._collect()
+        previous = self._state
+        added: dict[UUID, ServerState] = {}
+        online: dict[UUID, int] = {}
+        for server, info in state.items():
+            old = previous.get(server, None)
+            if old is None or old.name != info.name or old.max_players != info.max_players or old.reachable != info.reachable:
+                # Name, slot or reachability changes are sent as a re-add
+                added[server] = info
+            elif old.online != info.online:
+                online[server] = info.online
+        removed = [server for server in previous if server not in state]
+        self._state = state
+        if not (added or removed or online):
+            return
+
+        self._snapshot_event = None
+        event = self._encode_event("delta", {
+            "online_servers": len(state),
+            "online_players": sum(info.online for info in state.values()),
+            "added": {server: self._encode_server(info) for server, info in added.items()},
+            "unreachable": self._unreachable(added),
+            "removed": removed,
+            "online": online,
+        })
+        for subscriber in list(self._subscribers):
+            if not subscriber.push(event):
+                self._subscribers.discard(subscriber)
+
+    async def _collect(self) -> dict[UUID, ServerState]:
+        servers = await self._server_manager.get_online_servers()
+        listed = [(server, record) for server, record in servers.items() if self._server_manager.is_listed(server, record)]
+        # Flagged like in the list, with hidden unreachable servers there is nothing left to flag
+        unreachable = set(self._server_manager.flag_unreachable(server for server, _ in listed) or ())
+        return {
+            server: ServerState(
+                name=record.display_name,
+                online=record.online,
+                max_players=record.max_players,
+                reachable=server not in unreachable,
+            )
+            for server, record in listed
+        }
+
+    def _encode_snapshot(self, state: dict[UUID, ServerState]) -> bytes:
+        return self._encode_event("snapshot", {
+            "online_servers": len(state),
+            "online_players": sum(info.online for info in state.values()),
+            "servers": {server: self._encode_server(info) for server, info in state.items()},
+            "unreachable": self._unreachable(state),
+        })
+
+    @staticmethod
+    def _unreachable(servers: dict[UUID, ServerState]) -> list[UUID]:
+        return [server for server, info in servers.items() if not info.reachable]
+
+    @staticmethod
+    def _encode_server(info: ServerState) -> dict:
+        return {"name": info.name, "online": info.online, "maxPlayers": info.max_players}
+
+    @staticmethod
+    def _encode_event(event: str, data: dict) -> bytes:
+        return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
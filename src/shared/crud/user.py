@@ -5,9 +5,11 @@ from typing import Optional
 from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from shared.models import UserPublicInfo, UserAccount
+from shared.enum import AccessStatus
+from shared.models import User, UserPublicInfo, UserAccount
+from shared.utils.jwt import revoke_tokens_by_user_id
 
-__all__ = ("read_user_info_by_id", "update_user_info_by_id", "update_user_last_activity")
+__all__ = ("read_user_info_by_id", "update_user_info_by_id", "update_user_last_activity", "update_user_status")
 
 # Read
 async def read_user_info_by_id(session: AsyncSession, user_id: int) -> Optional[UserPublicInfo]:
@@ -28,4 +30,20 @@ async def update_user_last_activity(
         .where(UserAccount.user_id == user_id)
         .values(last_ip=client_ip, last_login=datetime.now(timezone.utc))
     )
-    return result.rowcount > 0
\ No newline at end of file
+    return result.rowcount > 0
+
+
+async def update_user_status(
+    session: AsyncSession, user_id: int, status: AccessStatus, description: Optional[str] = None
+) -> bool:
+    # Commits, the revocation of a restricted user has to follow the committed status change
+    user = await session.get(User, user_id)
+    if user is None:
+        return False
+    user.set_status(status=status, description=description)
+    if user.is_restricted:
+        # Bans and removals end every session of the user right away
+        await revoke_tokens_by_user_id(db_session=session, user_id=user_id)
+    else:
+        await session.commit()
+    return True
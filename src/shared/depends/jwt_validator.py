@@ -1,8 +1,10 @@
 import logging
 from typing import Optional
 from jwt.exceptions import InvalidTokenError, InvalidJTIError, PyJWTError
+from redis.exceptions import RedisError
 
-from fastapi import Request, Response, Depends
+from fastapi import Response, Depends
+from fastapi.requests import HTTPConnection
 from sqlalchemy.ext.asyncio import AsyncSession
 from user_agents.parsers import UserAgent
 
@@ -21,6 +23,7 @@ from shared.utils.jwt import (
     issue_access_by_refresh,
     read_refresh_token_by_jti,
     get_display_name_by_user_id,
+    token_revocation_store,
 )
 from . import parse_useragent_depends, database_session_depends
 
@@ -29,7 +32,7 @@ logger = logging.getLogger("console")
 __all__ = ("jwt_validator_depends",)
 
 async def jwt_validator_depends(
-    request: Request,
+    request: HTTPConnection,
     response: Response,
     user_agent: UserAgent = Depends(parse_useragent_depends),
     db_session: AsyncSession = Depends(database_session_depends),
@@ -46,6 +49,10 @@ async def jwt_validator_depends(
         elif access_token and not refresh_token:
             clear_token_cookie(response=response)
             access_payload = None
+        elif access_token and (
+            access_payload := await read_fresh_access(access_token=access_token, aud=user_agent.get_device())
+        ):
+            pass
         elif refresh_token:
             aud = user_agent.get_device()
             refresh_payload = jwt_decode(token=refresh_token, aud=aud, iss=project.name)
@@ -98,4 +105,23 @@ async def jwt_validator_depends(
     except PyJWTError:
         clear_token_cookie(response=response)
         return None
-    return access_payload
\ No newline at end of file
+    return access_payload
+
+
+async def read_fresh_access(access_token: JwtAccessToken, aud: str) -> Optional[JwtAccessPayload]:
+    # Fast path: a valid access token that is not due for reissue is trusted after one signature check
+    # and the revocation lookup. Anything else goes through the refresh token and the database.
+    try:
+        access_payload = jwt_decode(access_token, aud=aud, iss=project.name)
+    except PyJWTError:
+        return None
+    if not isinstance(access_payload, JwtAccessPayload) or need_for_reissue(access_payload):
+        return None
+    try:
+        if await token_revocation_store.is_revoked(access_payload):
+            return None
+    except RedisError as e:
+        # Without the revocation lookup the token is checked against the database instead
+        logger.warning("Token revocation lookup failed: %s", e)
+        return None
+    return access_payload
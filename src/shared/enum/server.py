@@ -1,6 +1,6 @@
 from enum import StrEnum, auto
 
-__all__ = ("ServerGamemode",)
+__all__ = ("ServerGamemode", "ServerHeartbeatStatus", "ServersSort", "HistoryResolution",)
 
 class ServerGamemode(StrEnum):
     none = auto()
@@ -11,3 +11,18 @@ class ServerGamemode(StrEnum):
     pvp = auto()
     pve = auto()
     mmo = auto()
+
+class ServerHeartbeatStatus(StrEnum):
+    updated = auto()
+    registered = auto()
+    not_found = auto()
+    forbidden = auto()
+
+class ServersSort(StrEnum):
+    online = auto()
+    name = auto()
+
+class HistoryResolution(StrEnum):
+    minute = auto()
+    hour = auto()
+    day = auto()
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from datetime import datetime
+from datetime import datetime, timezone
 
 from sqlalchemy import TIMESTAMP, Enum, String, func
 from sqlalchemy.orm import Mapped, mapped_column
@@ -16,6 +16,15 @@ class StatusMixin:
     status_timestamp: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
     status_description: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
 
+    @property
+    def is_restricted(self) -> bool:
+        return self.status != AccessStatus.active
+
+    def set_status(self, status: AccessStatus, description: Optional[str] = None) -> None:
+        self.status = status
+        self.status_timestamp = datetime.now(timezone.utc)
+        self.status_description = description
+
 class CreatedAtMixin:
     __abstract__ = True
     create: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
@@ -9,6 +9,7 @@ from pydantic import SecretBytes
 from sqlalchemy import (
     CheckConstraint,
     Integer,
+    SmallInteger,
     MetaData,
     String,
     Boolean,
@@ -30,7 +31,7 @@ from sqlalchemy.ext.asyncio import AsyncAttrs
 
 
 from core import project
-from shared.enum import UserProvider, ServerGamemode
+from shared.enum import UserProvider, ServerGamemode, HistoryResolution
 
 from .mixin import StatusMixin, CreatedAtMixin, TimestampMixin, UpdatedAtMixin
 from .custom_type import SecretByteType, ULIDType
@@ -43,7 +44,9 @@ __all__ = (
     "RefreshToken",
     "Server",
     "ServerPublicInfo",
+    "ServerCredential",
     "GameSession",
+    "ServerOnlineHistory",
 )
 
 # Base Model
@@ -148,13 +151,20 @@ class GameSession(Base, CreatedAtMixin):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey(f"{project.name}.user.user_id"), nullable=False)
     server_uuid: Mapped[UUID_TYPE] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{project.name}.server.uuid"), nullable=False)
     
-    session_token: Mapped[str] = mapped_column(String(1024), nullable=False)
+    session_token: Mapped[str] = mapped_column(String(1024), nullable=False, index=True)
     reg_ip: Mapped[IPv4Address] = mapped_column(INET, nullable=False)
     last_login: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
     
     user: Mapped["User"] = relationship(back_populates="sessions")
     server: Mapped["Server"] = relationship(back_populates="sessions")
 
+class ServerOnlineHistory(Base):
+    server_uuid: Mapped[UUID_TYPE] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{project.name}.server.uuid"), primary_key=True)
+    resolution: Mapped[HistoryResolution] = mapped_column(Enum(HistoryResolution), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), primary_key=True)
+
+    online: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+
 class FavoriteServer(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey(f"{project.name}.user.user_id"), primary_key=True)
     server_uuid: Mapped[UUID_TYPE] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{project.name}.server.uuid"), primary_key=True)
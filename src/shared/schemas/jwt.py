@@ -10,9 +10,10 @@ __all__ = (
     "JwtAccessToken",
     "JwtRefreshPayload",
     "JwtAccessPayload",
+    "JwtGameSessionPayload",
 )
 
-TokenTypeStr = Literal["access", "refresh"]
+TokenTypeStr = Literal["access", "refresh", "game"]
 JwtRefreshToken: TypeAlias = str
 JwtAccessToken: TypeAlias = str
 
@@ -45,3 +46,8 @@ class JwtAccessPayload(JwtBasePayload):
     type: Literal["access"] = Field(default="access")
     uname: str = Field(min_length=3, max_length=64)
 
+
+class JwtGameSessionPayload(JwtBasePayload):
+    # sub is the user id, aud the server UUID and jti the audit GameSession id
+    type: Literal["game"] = Field(default="game")
+    jti: str = Field(default_factory=lambda: str(ULID()))
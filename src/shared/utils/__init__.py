@@ -1,2 +1,3 @@
 from .cookie import *
+from .etag import *
 from .secret_keys import *
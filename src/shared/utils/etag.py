@@ -0,0 +1,18 @@
+from hashlib import blake2b
+from typing import Optional
+
+__all__ = ("make_etag", "etag_matches",)
+
+
+def make_etag(content: bytes) -> str:
+    return f'"{blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -1,3 +1,6 @@
 from .provider import *
 from .crud import *
 from .issue_tokens import *
+from .revocation import *
+from .token_cache import *
+from .key_ring import *
\ No newline at end of file
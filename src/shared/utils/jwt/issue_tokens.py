@@ -5,8 +5,9 @@ from fastapi import Response
 from core import project
 from shared.schemas import JwtRefreshPayload, JwtAccessPayload, JwtAccessToken, JwtRefreshToken
 
-from .provider import create_refresh, create_access
-from .crud import create_or_update_refresh_token, delete_refresh_by_jti
+from .provider import create_refresh, create_access, access_expire
+from .crud import create_or_update_refresh_token, delete_refresh_by_jti, delete_refresh_all_by_user_id
+from .revocation import token_revocation_store
 from ..cookie import cookie_change, cookie_clear
 
 __all__ = (
@@ -15,6 +16,7 @@ __all__ = (
     "issue_refresh_and_access_tokens",
     "clear_token_cookie",
     "review_tokens_by_jti",
+    "revoke_tokens_by_user_id",
 )
 
 async def issue_refresh(
@@ -79,7 +81,21 @@ async def review_tokens_by_jti(
     db_session: AsyncSession,
     response: Response,
     jti: str,
+    expire_at: float,
     ) -> None:
 
     await delete_refresh_by_jti(session=db_session, jti=jti)
+    await db_session.commit()
+    # Access tokens with this jti are accepted without the database until they expire. Revoked
+    # only after the commit, a rollback must not leave a revocation behind
+    await token_revocation_store.revoke(jti=jti, expire_at=expire_at)
     clear_token_cookie(response=response)
+
+
+async def revoke_tokens_by_user_id(db_session: AsyncSession, user_id: int) -> int:
+    deleted = await delete_refresh_all_by_user_id(session=db_session, account_user_id=user_id)
+    await db_session.commit()
+    # Access tokens already issued would otherwise stay valid on the stateless path. Revoked only
+    # after the commit, a rollback must not leave a revocation behind
+    await token_revocation_store.revoke_user(sub=user_id, lifetime=access_expire)
+    return deleted
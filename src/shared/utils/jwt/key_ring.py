@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import re
+from typing import Literal, Optional, NamedTuple
+
+import jwt
+import orjson
+from jwt.algorithms import get_default_algorithms
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes, PublicKeyTypes
+
+from ..etag import make_etag
+
+__all__ = (
+    "JwtAlgorithm",
+    "SigningKey",
+    "KeyRing",
+)
+
+JwtAlgorithm = Literal["RS256", "ES256", "EdDSA"]
+
+PEM_BLOCK = re.compile(rb"-----BEGIN [A-Z ]+-----.+?-----END [A-Z ]+-----", re.DOTALL)
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: JwtAlgorithm
+    public_key: PublicKeyTypes
+    private_key: Optional[PrivateKeyTypes] = None
+
+
+class KeyRing:
+    # PEM keys are parsed once at startup, PyJWT gets the key objects instead of re-parsing strings on
+    # every call. Tokens are signed with the current key and carry its kid, verification accepts any
+    # key in the ring with the algorithm of that key, so previous keys keep older tokens valid through
+    # a rotation or a switch to another algorithm.
+    def __init__(self, current: SigningKey, previous: tuple[SigningKey, ...] = ()) -> None:
+        if current.private_key is None:
+            raise ValueError("The current key must have a private key")
+        self.current = current
+        self._keys = {key.kid: key for key in (*previous, current)}
+        self._jwks = orjson.dumps({"keys": [self._to_jwk(key) for key in self._keys.values()]})
+        self._jwks_etag = make_etag(self._jwks)
+
+    @classmethod
+    def from_pem(
+        cls,
+        private_pem: bytes,
+        public_pem: bytes,
+        previous_pem: Optional[bytes] = None,
+        algorithm: JwtAlgorithm = "RS256",
+        ) -> "KeyRing":
+        private_key = serialization.load_pem_private_key(private_pem, password=None)
+        public_key = serialization.load_pem_public_key(public_pem)
+        if cls.algorithm_for(public_key) != algorithm or cls.algorithm_for(private_key.public_key()) != algorithm:
+            raise ValueError(f"The signing key pair does not match the {algorithm} algorithm")
+        current = SigningKey(kid=cls.make_kid(public_key), algorithm=algorithm, public_key=public_key, private_key=private_key)
+        previous = []
+        # Any number of concatenated PEM blocks of any supported type, oldest keys can simply be
+        # dropped from the file
+        for block in PEM_BLOCK.findall(previous_pem or b""):
+            key = serialization.load_pem_public_key(block)
+            previous.append(SigningKey(kid=cls.make_kid(key), algorithm=cls.algorithm_for(key), public_key=key))
+        return cls(current=current, previous=tuple(previous))
+
+    @staticmethod
+    def algorithm_for(public_key: PublicKeyTypes) -> JwtAlgorithm:
+        if isinstance(public_key, rsa.RSAPublicKey):
+            return "RS256"
+        if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+            return "ES256"
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            return "EdDSA"
+        raise ValueError(f"Unsupported key type: {type(public_key).__name__}")
+
+    @staticmethod
+    def make_kid(public_key: PublicKeyTypes) -> str:
+        der = public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        return base64.urlsafe_b64encode(hashlib.sha256(der).digest()[:12]).decode()
+
+    @property
+    def jwks(self) -> bytes:
+        return self._jwks
+
+    @property
+    def jwks_etag(self) -> str:
+        return self._jwks_etag
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(
+            payload=payload,
+            key=self.current.private_key,
+            algorithm=self.current.algorithm,
+            headers={"kid": self.current.kid},
+        )
+
+    def verification_key(self, token: str) -> SigningKey:
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid", None)
+        if kid is None:
+            # Issued before kid stamping, by whichever key of the ring uses the same algorithm
+            if header.get("alg", None) == self.current.algorithm:
+                return self.current
+            for key in self._keys.values():
+                if key.algorithm == header.get("alg", None):
+                    return key
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+        key = self._keys.get(kid, None)
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown key id: {kid}")
+        return key
+
+    @staticmethod
+    def _to_jwk(key: SigningKey) -> dict:
+        jwk = get_default_algorithms()[key.algorithm].to_jwk(key.public_key, as_dict=True)
+        jwk.update(kid=key.kid, alg=key.algorithm, use="sig")
+        return jwk
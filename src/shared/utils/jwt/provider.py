@@ -1,40 +1,55 @@
-from typing import Literal, Union
+from typing import Union
 from time import time
 
 import jwt
 
-from core import secret
-from shared.schemas.jwt import JwtRefreshPayload, JwtAccessPayload
+from core import secret, settings
+from shared.schemas.jwt import JwtRefreshPayload, JwtAccessPayload, JwtGameSessionPayload
+from .token_cache import VerifiedTokenCache
+from .key_ring import KeyRing
 
 __all__ = (
     "jwt_encode",
     "jwt_decode",
     "create_refresh",
     "create_access",
+    "create_game_session_token",
     "need_for_reissue",
+    "verified_token_cache",
+    "key_ring",
 )
 
-algorithm: Literal["RS256"] = "RS256"
 refresh_expire: float  = 1209600
 access_expire: float = 900
+game_session_expire: float = 300
 reissue: float = 0.25
-public_key = secret.rsa_public
-private_key = secret.rsa_private
+signing_private = secret.jwt_private or secret.rsa_private
+signing_public = secret.jwt_public or secret.rsa_public
+previous_public = secret.jwt_public_previous or secret.rsa_public_previous
+if signing_private is None or signing_public is None:
+    raise RuntimeError("No JWT signing key pair found in the secret directory")
+key_ring = KeyRing.from_pem(
+    private_pem=signing_private.get_secret_value().encode(),
+    public_pem=signing_public.get_secret_value().encode(),
+    previous_pem=previous_public.get_secret_value().encode() if previous_public else None,
+    algorithm=settings.jwt.algorithm,
+)
+verified_token_cache = VerifiedTokenCache()
 
 
-def jwt_encode(payload: Union[JwtRefreshPayload, JwtAccessPayload]) -> str:
-    return jwt.encode(
-        payload=payload.model_dump(mode="json"),
-        algorithm=algorithm,
-        key=private_key.get_secret_value(),
-    )
+def jwt_encode(payload: Union[JwtRefreshPayload, JwtAccessPayload, JwtGameSessionPayload]) -> str:
+    return key_ring.encode(payload.model_dump(mode="json"))
 
 
-def jwt_decode(token: str, iss: str, aud: str) -> Union[JwtRefreshPayload, JwtAccessPayload]:
+def jwt_decode(token: str, iss: str, aud: str) -> Union[JwtRefreshPayload, JwtAccessPayload, JwtGameSessionPayload]:
+    cached = verified_token_cache.get(token, iss=iss, aud=aud)
+    if cached is not None:
+        return cached
+    key = key_ring.verification_key(token)
     decoded = jwt.decode_complete(
         jwt=token,
-        key=public_key.get_secret_value(),
-        algorithms=[algorithm],
+        key=key.public_key,
+        algorithms=[key.algorithm],
         audience=aud,
         issuer=iss,
         leeway=5,
@@ -47,7 +62,9 @@ def jwt_decode(token: str, iss: str, aud: str) -> Union[JwtRefreshPayload, JwtAc
             },
     )
     payload_class = get_payload_class(decoded["payload"]["type"])
-    return payload_class.model_validate(decoded["payload"])
+    payload = payload_class.model_validate(decoded["payload"])
+    verified_token_cache.put(token, payload)
+    return payload
 
 
 def create_refresh( sub: str, iss: str, aud: str) -> tuple[str, JwtRefreshPayload]:
@@ -82,11 +99,31 @@ def create_access(
     access_token = jwt_encode(access_payload)
     return access_token, access_payload
 
+def create_game_session_token(
+    sub: str,
+    iss: str,
+    aud: str,
+    expire: float = game_session_expire,
+) -> tuple[str, JwtGameSessionPayload]:
+    time_now = time()
+    session_payload = JwtGameSessionPayload(
+        sub=sub,
+        iss=iss,
+        exp=time_now + expire,
+        aud=aud,
+        iat=time_now,
+        nbf=time_now
+    )
+    session_token = jwt_encode(session_payload)
+    return session_token, session_payload
+
 def get_payload_class(token_type: str):
     if token_type == "refresh":
         return JwtRefreshPayload
     elif token_type == "access":
         return JwtAccessPayload
+    elif token_type == "game":
+        return JwtGameSessionPayload
     else:
         raise jwt.InvalidTokenError(f"Unsupported token type: {token_type}")
 
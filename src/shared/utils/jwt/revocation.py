@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from time import time, monotonic
+from typing import Optional, Union
+
+from core import redis_manager
+from core.cache.redis_manager import RedisManager
+from shared.schemas import JwtAccessPayload, JwtRefreshPayload
+
+__all__ = (
+    "TokenRevocationStore",
+    "token_revocation_store",
+)
+
+REVOKED_KEY = "jwt:revoked:{jti}"
+REVOKED_USER_KEY = "jwt:revoked_user:{sub}"
+
+
+class TokenRevocationStore:
+    # Redis entries live only as long as a revoked token could still pass the signature check. Tokens
+    # found not revoked are remembered in process for negative_ttl seconds, so a revocation made by
+    # another worker can take up to that long to apply here.
+    def __init__(
+        self,
+        redis_manager: RedisManager,
+        negative_ttl: float = 2.0,
+        maxsize: int = 10000,
+        ) -> None:
+        self._redis = redis_manager
+        self._negative_ttl = negative_ttl
+        self._maxsize = maxsize
+        self._not_revoked: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def revoke(self, jti: str, expire_at: float) -> None:
+        self._not_revoked.pop(jti, None)
+        ttl = int(expire_at - time()) + 1
+        if ttl <= 0:
+            return
+        async with self._redis.get_client_context() as client:
+            await client.set(REVOKED_KEY.format(jti=jti), 1, ex=ttl)
+
+    async def revoke_user(self, sub: Union[int, str], lifetime: float) -> None:
+        # Every token of the user issued up to now, lifetime is the longest a token stays valid.
+        # Call it after the commit that ends the user's sessions
+        sub = str(sub)
+        for jti in [jti for jti, (_, cached_sub) in self._not_revoked.items() if cached_sub == sub]:
+            del self._not_revoked[jti]
+        async with self._redis.get_client_context() as client:
+            await client.set(REVOKED_USER_KEY.format(sub=sub), time(), ex=int(lifetime) + 1)
+
+    async def is_revoked(self, payload: Union[JwtAccessPayload, JwtRefreshPayload]) -> bool:
+        cached = self._not_revoked.get(payload.jti, None)
+        if cached is not None and monotonic() - cached[0] < self._negative_ttl:
+            return False
+
+        async with self._redis.get_client_context() as client:
+            revoked_jti, revoked_user_at = await client.mget(
+                REVOKED_KEY.format(jti=payload.jti),
+                REVOKED_USER_KEY.format(sub=payload.sub),
+            )
+        if revoked_jti is not None or self._issued_before(payload, revoked_user_at):
+            self._not_revoked.pop(payload.jti, None)
+            return True
+
+        self._not_revoked[payload.jti] = (monotonic(), payload.sub)
+        self._not_revoked.move_to_end(payload.jti)
+        while len(self._not_revoked) > self._maxsize:
+            self._not_revoked.popitem(last=False)
+        return False
+
+    @staticmethod
+    def _issued_before(payload: Union[JwtAccessPayload, JwtRefreshPayload], revoked_at: Optional[str]) -> bool:
+        return revoked_at is not None and payload.iat <= float(revoked_at)
+
+
+token_revocation_store = TokenRevocationStore(redis_manager)
@@ -0,0 +1,63 @@
+import hashlib
+from collections import OrderedDict
+from time import time
+from typing import Optional, Union
+
+from shared.schemas import JwtAccessPayload, JwtRefreshPayload, JwtGameSessionPayload
+
+__all__ = (
+    "VerifiedTokenCache",
+)
+
+JwtPayload = Union[JwtRefreshPayload, JwtAccessPayload, JwtGameSessionPayload]
+
+
+class VerifiedTokenCache:
+    # Payloads that already passed the signature check and validation, kept until they expire.
+    # Keyed by a digest so the cache never holds usable tokens. Payload models are frozen, so the
+    # same instance is safely handed to every request.
+    def __init__(self, maxsize: int = 10000) -> None:
+        self._entries: OrderedDict[bytes, JwtPayload] = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, token: str, iss: str, aud: str) -> Optional[JwtPayload]:
+        key = self._key(token)
+        payload = self._entries.get(key, None)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload.exp <= time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        if payload.iss != iss or payload.aud != aud:
+            # Same token presented for another audience, let the full check reject it
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: JwtPayload) -> None:
+        key = self._key(token)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
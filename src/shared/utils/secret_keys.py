@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Literal, Union
 from pathlib import Path
@@ -10,10 +11,7 @@ from cryptography.hazmat.primitives import serialization
 
 logger = logging.getLogger("app")
 
-async def generate_rsa_keys(path: Path, key_size: int = 2048) -> None:
-    if key_size < 2048:
-        raise ValueError("RSA key size must be at least 2048 bits for security.")
-    
+def _generate_rsa_pem(key_size: int) -> tuple[bytes, bytes]:
     private_key = rsa.generate_private_key(
         public_exponent=65537, 
         key_size=key_size,
@@ -29,8 +27,18 @@ async def generate_rsa_keys(path: Path, key_size: int = 2048) -> None:
         encoding=serialization.Encoding.PEM,
         format=serialization.PublicFormat.SubjectPublicKeyInfo
     )
-    private_path = path / "rsa_private.pem"
-    public_path = path / "rsa_public.pem"
+    return private_pem, public_pem
+
+
+async def generate_rsa_keys(path: Path, key_size: int = 2048) -> None:
+    if key_size < 2048:
+        raise ValueError("RSA key size must be at least 2048 bits for security.")
+
+    # Prime search takes from a fraction of a second to several seconds at 4096 bits
+    private_pem, public_pem = await asyncio.to_thread(_generate_rsa_pem, key_size)
+    # The same file names open_rsa_key and SecretSettings read
+    private_path = path / "rsa_private"
+    public_path = path / "rsa_public"
 
     async with aiofiles.open(private_path, "wb") as f:
         await f.write(private_pem)
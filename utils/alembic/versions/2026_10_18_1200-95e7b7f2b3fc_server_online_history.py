@@ -0,0 +1,37 @@
+"""server online history
+
+Revision ID: 95e7b7f2b3fc
+Revises: 4ddb93a7ba3b
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '95e7b7f2b3fc'
+down_revision: Union[str, Sequence[str], None] = '4ddb93a7ba3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('server_online_history',
+    sa.Column('server_uuid', sa.UUID(), nullable=False),
+    sa.Column('resolution', sa.Enum('minute', 'hour', 'day', name='historyresolution'), nullable=False),
+    sa.Column('bucket_start', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('online', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['server_uuid'], ['skymp-masterapi.server.uuid'], ),
+    sa.PrimaryKeyConstraint('server_uuid', 'resolution', 'bucket_start'),
+    schema='skymp-masterapi'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('server_online_history', schema='skymp-masterapi')
+    sa.Enum(name='historyresolution').drop(op.get_bind(), checkfirst=True)
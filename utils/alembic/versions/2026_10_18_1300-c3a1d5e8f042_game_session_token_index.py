@@ -0,0 +1,27 @@
+"""game session token index
+
+Revision ID: c3a1d5e8f042
+Revises: 95e7b7f2b3fc
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a1d5e8f042'
+down_revision: Union[str, Sequence[str], None] = '95e7b7f2b3fc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_skymp-masterapi_game_session_session_token'), 'game_session', ['session_token'], unique=False, schema='skymp-masterapi')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_skymp-masterapi_game_session_session_token'), table_name='game_session', schema='skymp-masterapi')
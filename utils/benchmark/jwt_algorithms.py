@@ -0,0 +1,81 @@
+"""Sign and verify throughput of the supported JWT algorithms.
+
+Signs and verifies an access token payload through KeyRing with RS256 at 2048
+and 4096 bits (the README key size), ES256 and EdDSA, on one core. The JWT
+verified-token cache is bypassed, every verify does the full check. Run from
+the project root: `uv run utils/benchmark/jwt_algorithms.py`
+"""
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from shared.utils.jwt.key_ring import KeyRing  # noqa: E402
+
+DURATION = 1.0
+PAYLOAD = {
+    "type": "access",
+    "sub": "123456",
+    "jti": "01JABCDEFGHJKMNPQRSTVWXYZ0",
+    "iss": "skymp-masterapi",
+    "aud": "PC",
+    "iat": time.time(),
+    "nbf": time.time(),
+    "exp": time.time() + 900,
+    "uname": "Benchmark",
+}
+KEYS: dict[str, Callable] = {
+    "RS256-2048": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "RS256-4096": lambda: rsa.generate_private_key(public_exponent=65537, key_size=4096),
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "EdDSA": lambda: ed25519.Ed25519PrivateKey.generate(),
+}
+
+
+def make_ring(private_key) -> KeyRing:
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    algorithm = KeyRing.algorithm_for(private_key.public_key())
+    return KeyRing.from_pem(private_pem=private_pem, public_pem=public_pem, algorithm=algorithm)
+
+
+def rate(operation: Callable[[], object]) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + DURATION
+    while time.perf_counter() < deadline:
+        operation()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def verify(ring: KeyRing, token: str) -> dict:
+    key = ring.verification_key(token)
+    return jwt.decode(token, key=key.public_key, algorithms=[key.algorithm], audience="PC", issuer="skymp-masterapi")
+
+
+if __name__ == "__main__":
+    print(f"{'algorithm':>10} | {'keygen ms':>9} | {'sign/s':>8} | {'verify/s':>8} | {'token bytes':>11}")
+    for name, generate in KEYS.items():
+        started = time.perf_counter()
+        private_key = generate()
+        keygen = (time.perf_counter() - started) * 1000
+        ring = make_ring(private_key)
+        token = ring.encode(PAYLOAD)
+        signs = rate(partial(ring.encode, PAYLOAD))
+        verifies = rate(partial(verify, ring, token))
+        print(f"{name:>10} | {keygen:>9.1f} | {signs:>8.0f} | {verifies:>8.0f} | {len(token):>11}")
@@ -0,0 +1,91 @@
+"""Expiry sweep cost of ServerManagementTask at 1k/10k/100k registered servers.
+
+Compares the previous full scan of the expiry dict with the deadline ordered
+ExpiryIndex. Each tick expires ~1% of the servers, the rest keep sending
+heartbeats. Run from the project root: `uv run utils/benchmark/registry_expiry.py`
+"""
+import asyncio
+import sys
+import time
+import random
+from ipaddress import IPv4Address
+from pathlib import Path
+from uuid import UUID, uuid4
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from modules.servers.schema import ServerRecord  # noqa: E402
+from modules.servers.utils import ServerManagementTask  # noqa: E402
+from shared.enum.server import ServerGamemode  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+TICKS = 20
+EXPIRE = 7.5
+EXPIRED_SHARE = 0.01
+
+
+def make_record() -> ServerRecord:
+    return ServerRecord(
+        display_name="Benchmark server",
+        host=IPv4Address("127.0.0.1"),
+        port=7777,
+        online=random.randint(0, 100),
+        max_players=100,
+        gamemode=ServerGamemode.none,
+        manifest_hash="0" * 64,
+    )
+
+
+def scan_sweep(expires: dict[UUID, float], online: dict[UUID, ServerRecord], now: float) -> int:
+    removed = 0
+    for server, expire_at in list(expires.items()):
+        if expire_at < now:
+            expires.pop(server, None)
+            online.pop(server, None)
+            removed += 1
+    return removed
+
+
+async def run(size: int) -> tuple[float, float]:
+    # Inside the event loop, ServerManagementTask publishes added servers at the end of the iteration
+    servers = [uuid4() for _ in range(size)]
+    record = make_record()
+
+    task = ServerManagementTask(registry=None)
+    scan_expires: dict[UUID, float] = {}
+    scan_online: dict[UUID, ServerRecord] = {}
+    now = time.time()
+    for server in servers:
+        task._servers_expires.push(server, now + EXPIRE)
+        scan_expires[server] = now + EXPIRE
+        scan_online[server] = record
+    task._publish_servers(added=dict.fromkeys(servers, record))
+    task._flush_pending()
+
+    index_total = scan_total = 0.0
+    expired_per_tick = max(1, int(size * EXPIRED_SHARE))
+    for tick in range(1, TICKS + 1):
+        # Expire a slice of the servers and refresh everyone else, as heartbeats would
+        tick_now = now + tick * EXPIRE
+        alive = servers[expired_per_tick * tick:]
+        for server in alive:
+            task._servers_expires.push(server, tick_now + EXPIRE)
+            scan_expires[server] = tick_now + EXPIRE
+        sweep_at = tick_now + 0.001
+
+        start = time.perf_counter()
+        task._sweep_expired(sweep_at)
+        index_total += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scan_sweep(scan_expires, scan_online, sweep_at)
+        scan_total += time.perf_counter() - start
+
+    return scan_total / TICKS, index_total / TICKS
+
+
+if __name__ == "__main__":
+    print(f"{'servers':>10} | {'full scan, ms':>14} | {'index, ms':>10} | {'speedup':>8}")
+    for size in SIZES:
+        scan, index = asyncio.run(run(size))
+        print(f"{size:>10} | {scan * 1000:>14.3f} | {index * 1000:>10.3f} | {scan / index:>7.1f}x")
@@ -0,0 +1,113 @@
+"""Memory held per registered server by ServerManagementTask.
+
+Compares the slotted ServerRecord with the pydantic model the registry used to
+store, both with the parsed manifest it carried per server and with only the
+manifest hash. Run from the
+project root: `uv run utils/benchmark/registry_memory.py`
+"""
+import sys
+import gc
+import random
+import tracemalloc
+from ipaddress import IPv4Address
+from pathlib import Path
+from typing import Callable
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "src"))
+
+from modules.servers.schema import ServerRecord, ServerModsManifest  # noqa: E402
+from shared.enum.server import ServerGamemode  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+MODS = 20
+
+
+class PydanticStorage(BaseModel):
+    # Registry entry before the slotted record
+    display_name: str
+    host: IPv4Address
+    port: int
+    online: int
+    max_players: int
+    gamemode: ServerGamemode
+    manifest: ServerModsManifest
+
+
+class PydanticHashStorage(BaseModel):
+    display_name: str
+    host: IPv4Address
+    port: int
+    online: int
+    max_players: int
+    gamemode: ServerGamemode
+    manifest_hash: str
+
+
+def make_manifest() -> ServerModsManifest:
+    return ServerModsManifest.model_validate({
+        "mods": [
+            {"filename": f"mod_{i}.pak", "crc32": random.getrandbits(32), "size": random.randint(1, 1 << 30)}
+            for i in range(MODS)
+        ],
+        "versionMajor": 1,
+        "loadOrder": [f"mod_{i}" for i in range(MODS)],
+    })
+
+
+def make_pydantic(index: int) -> PydanticStorage:
+    # Every entry got its own manifest instance out of the heartbeat payload
+    return PydanticStorage(
+        display_name=f"Benchmark server {index}",
+        host=IPv4Address(0x0A000000 + index),
+        port=7777,
+        online=random.randint(0, 100),
+        max_players=100,
+        gamemode=ServerGamemode.none,
+        manifest=make_manifest(),
+    )
+
+
+def make_pydantic_hash(index: int) -> PydanticHashStorage:
+    return PydanticHashStorage(
+        display_name=f"Benchmark server {index}",
+        host=IPv4Address(0x0A000000 + index),
+        port=7777,
+        online=random.randint(0, 100),
+        max_players=100,
+        gamemode=ServerGamemode.none,
+        manifest_hash=f"{random.getrandbits(256):064x}",
+    )
+
+
+def make_record(index: int) -> ServerRecord:
+    return ServerRecord(
+        display_name=f"Benchmark server {index}",
+        host=IPv4Address(0x0A000000 + index),
+        port=7777,
+        online=random.randint(0, 100),
+        max_players=100,
+        gamemode=ServerGamemode.none,
+        manifest_hash=f"{random.getrandbits(256):064x}",
+    )
+
+
+def measure(size: int, factory: Callable[[int], object]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    servers = {uuid4(): factory(index) for index in range(size)}
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del servers
+    return current / size
+
+
+if __name__ == "__main__":
+    print(f"{'servers':>10} | {'pydantic+manifest':>17} | {'pydantic+hash':>13} | {'record':>6}  (bytes per server)")
+    for size in SIZES:
+        pydantic = measure(size, make_pydantic)
+        pydantic_hash = measure(size, make_pydantic_hash)
+        record = measure(size, make_record)
+        print(f"{size:>10} | {pydantic:>17.0f} | {pydantic_hash:>13.0f} | {record:>6.0f}")